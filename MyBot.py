@@ -1,18 +1,16 @@
 #!/usr/bin/env python3
 
 import sys
+import numpy as np
 import hlt
-from hlt import constants, Direction, Position
+from hlt import commands, constants, profiling, Direction
+from hlt.inspiration import InspirationField
+from hlt.mining import MiningPlanner
+from hlt.navigation import PathPlanner
+from hlt.pull import PullField
+from hlt.resolution import resolve_moves
 import logging
 import random
-import operator
-from bisect import bisect_left
-
-
-def binary_search(a, x, low=0, high=None):
-    high = high if high is not None else len(a)
-    pos = bisect_left(a, x, low, high)
-    return (pos if pos != high and a[pos] == x else -1)
 
 
 class Brain:
@@ -21,16 +19,27 @@ class Brain:
         Object containing all strategy.
         """
         self.game = game
+        self.pull = PullField(game.game_map)
+        self.inspiration = InspirationField(game.game_map.width, game.game_map.height)
+        # cheapest-route returns stay off until they match the greedy returns in self-play
+        self.plan_routes = False
+        self.paths = None
+        # multi-turn mining plans stay off until they match the pull field in self-play
+        self.plan_mining = False
+        self.mining = None
+        self.targets = {}
         self.ship_status = {}
         self.return_amount = constants.MAX_HALITE * 0.8
         self.original_halite = 0
 
+    @profiling.timed()
     def take_turn(self):
         self.start_turn()
         self.move_ships()
         self.spawn()
         self.end_turn()
 
+    @profiling.timed()
     def start_turn(self):
         self.game.update_frame()
         self.map = self.game.game_map
@@ -38,6 +47,10 @@ class Brain:
         self.command_queue = []
         self.is_end_game = False
 
+        # forget ships that sank or became dropoffs
+        for ship_id in self.me.destroyed + self.me.converted:
+            self.ship_status.pop(ship_id, None)
+
         # total halite calculations
         if self.game.turn_number == 1:
             self.original_halite = self.calculate_halite_remaining()
@@ -46,6 +59,11 @@ class Brain:
 
         # process details of enemies
         self.process_enemies()
+        self.pull.update()
+        if self.plan_routes:
+            if self.paths is None:
+                self.paths = PathPlanner(self.map, self.me)
+            self.paths.update()
 
         # determine if we are in 'endgame'
         self.turns_left = constants.MAX_TURNS - self.game.turn_number
@@ -53,39 +71,22 @@ class Brain:
         if turns_to_bring_home >= self.turns_left:
             self.is_end_game = True
 
+    @profiling.timed()
     def calculate_halite_remaining(self):
-        total = 0
-        for row in range(self.map.height):
-            for col in range(self.map.width):
-                position = Position(row, col)
-                total += self.map[position].halite_amount
-
-        return total
+        return self.map.total_halite
 
+    @profiling.timed()
     def process_enemies(self):
-        inspired = {}
-        for player in self.game.players:
-            if player is not self.game.my_id:
-                for ship in self.game.players[player].get_ships():
-                    # mark current enemy positions as unsafe
-                    self.map[ship].mark_unsafe()
-
-                    #  find inspired positions
-                    for row in range(-constants.INSPIRATION_RADIUS, constants.INSPIRATION_RADIUS):
-                        for col in range(-constants.INSPIRATION_RADIUS, constants.INSPIRATION_RADIUS):
-                            x = ship.position.x + col
-                            y = ship.position.y + row
-                            if (x, y) in inspired:
-                                inspired[(x, y)] += 1
-                            else:
-                                inspired[(x, y)] = 1
-
-        #  marks these cells as being 'inspiring' to ships
-        for x_y_tuple, ship_count in inspired.items():
-            if ship_count >= 2:
-                position = Position(x_y_tuple[0], x_y_tuple[1])
-                self.map[position].mark_inspired()
+        enemy_ships = (self.map.ship_owner >= 0) & (self.map.ship_owner != self.game.my_id)
 
+        # mark current enemy positions as unsafe
+        self.map.mark_unsafe(np.flatnonzero(enemy_ships))
+
+        #  marks cells as being 'inspiring' to ships
+        inspired = self.inspiration.inspired(self.map.ship_owner, self.game.my_id)
+        self.map.mark_inspired(np.flatnonzero(inspired))
+
+    @profiling.timed()
     def spawn(self):
         if (self.me.halite_amount >= constants.SHIP_COST and
                 self.map[self.me.shipyard].safe and
@@ -93,13 +94,10 @@ class Brain:
             self.command_queue.append(self.me.shipyard.spawn())
             self.map[self.me.shipyard].mark_unsafe()
 
+    @profiling.timed()
     def end_turn(self):
         self.game.end_turn(self.command_queue)
 
-    def ship_binary_search(self, ships, id):
-        ship_ids = list(map(lambda x: x.id, ships))
-        return binary_search(ship_ids, id)
-
     def should_become_dropoff(self, ship):
         return False  # TODO
 
@@ -112,34 +110,17 @@ class Brain:
         return dropoffs
 
     def find_closest_dropoff(self, ship):
-        dropoffs = self.get_all_dropoffs()
-
-        closest = None
-        least_dist = sys.maxsize
-        for dropoff in dropoffs:
-            dist = self.map.calculate_distance(ship.position, dropoff.position)
-            if dist < least_dist:
-                least_dist = dist
-                closest = dropoff.position
-
-        return closest
+        return self.map.get_closest_dropoff(self.me, ship).position
 
     def is_dropoff(self, position):
         return self.map[position].has_structure
 
     def on_dropoff(self, ship):
-        dropoffs = self.get_all_dropoffs()
-
-        for dropoff in dropoffs:
-            if ship.position == dropoff.position:
-                return True
-
-        return False
+        return self.map.calculate_dropoff_distance(self.me, ship) == 0
 
     def should_return(self, ship):
         # ship should not go so far from dropoff that it can't return by end of game
-        closest_dropoff = self.find_closest_dropoff(ship)
-        dist_to_closest = self.map.calculate_distance(ship.position, closest_dropoff)
+        dist_to_closest = self.map.calculate_dropoff_distance(self.me, ship)
         out_of_moves = dist_to_closest >= self.turns_left + 1
 
         # ship should return if full
@@ -159,42 +140,30 @@ class Brain:
         else:
             return self.return_to_dropoff(ship)
 
+    @profiling.timed()
     def get_best_dir(self, ship):
-        directions = {
-                Direction.North: 0,
-                Direction.South: 0,
-                Direction.East: 0,
-                Direction.West: 0
-                }
-
-        for row in range(-10, 10):
-            for col in range(-10, 10):
-                if col == 0 and row == 0: continue
-
-                pos = Position(ship.position.x + col, ship.position.y + row)
-                dist = self.map.calculate_distance(ship.position, pos)
-                pull = self.map[pos].halite_amount / dist**2
-                if self.map[pos].inspired:
-                    pull *= (constants.INSPIRED_BONUS_MULTIPLIER + 1)
-
-                for move in self.map.get_unsafe_moves(ship.position, pos):
-                    directions[move] += pull
-
-        best_safe = None
-        while len(directions):
-            best_direction = max(directions.items(), key=operator.itemgetter(1))[0]
-            directions.pop(best_direction)
-            cell = self.map[ship.position.directional_offset(best_direction)]
+        for direction in self.pull.ranked_moves(ship):
+            cell = self.map[ship.position.directional_offset(direction)]
             if cell.safe:
-                best_safe = cell
-                break
+                return cell
 
-        if best_safe is None:
-            raise ValueError('No safe adjacent positions!')
-
-        return best_safe
+        raise ValueError('No safe adjacent positions!')
 
+    @profiling.timed()
     def explore(self, ship):
+        # head for the planned mining target, or mine here if that is the target
+        target = self.targets.get(ship.id)
+        if target is not None:
+            if target == ship.position:
+                if self.map[ship].safe:
+                    return (ship.position, Direction.Still)
+            else:
+                for direction in self.map.get_unsafe_moves(ship.position, target):
+                    cell = self.map[ship.position.directional_offset(direction)]
+                    if cell.safe:
+                        return (cell.position, direction)
+
+        # no plan, or the way is blocked: follow the halite pull unless staying is worth more
         best_cell = self.get_best_dir(ship)
         best_direction = self.map.get_unsafe_moves(ship.position, best_cell.position)[0]
 
@@ -215,7 +184,16 @@ class Brain:
         else:
             return (best_cell.position, best_direction)
 
+    @profiling.timed()
     def return_to_dropoff(self, ship):
+        # next step on the cheapest route home, if it is free
+        if self.plan_routes:
+            direction = self.paths.get_next_step(ship)
+            target_pos = ship.position.directional_offset(direction)
+            if direction != Direction.Still and (self.map[target_pos].safe or
+                                                 (self.is_dropoff(target_pos) and self.is_end_game)):
+                return (target_pos, direction)
+
         destination = self.find_closest_dropoff(ship)
         best_move = None
         best_cost = sys.maxsize
@@ -269,7 +247,17 @@ class Brain:
     def get_random_safe(self, ship):
         return random.choice(self.map.get_safe_adjacent(ship.position))
 
+    def rank_moves(self, ship, direction):
+        # chosen move first, then staying still, then any other safe move
+        ranked = [direction]
+        for move in [Direction.Still] + Direction.get_all_cardinals():
+            if move not in ranked and self.map[ship.position.directional_offset(move)].safe:
+                ranked.append(move)
+        return ranked
+
+    @profiling.timed()
     def move_ships(self):
+        stuck = []
         movable_ships = []
 
         for ship in self.me.get_ships():
@@ -280,42 +268,53 @@ class Brain:
                 self.command_queue.append(ship.make_dropoff())
             elif not self.ship_can_move(ship):
                 self.map[ship].mark_unsafe()
-                self.command_queue.append(ship.stay_still())
+                stuck.append((ship, [Direction.Still]))
             else:
                 movable_ships.append(ship)
 
         # sort ships by id
         movable_ships.sort(key=lambda x: x.id)
 
-        for i, ship in enumerate(movable_ships):
-            try:
-                position, direction = self.get_move(ship)
-            except Exception:
-                logging.info(Exception)
-                position = ship.position
+        # plan mining trips for exploring ships, one ship per target
+        if self.plan_mining:
+            if self.mining is None:
+                self.mining = MiningPlanner(self.map)
+            exploring = [ship for ship in movable_ships if self.ship_status[ship.id] == "exploring"]
+            self.targets = self.mining.plan(self.me, exploring, self.turns_left)
+
+        # leave time for resolving moves once this runs out
+        budget = self.game.clock.budget(0.8)
+
+        candidates = []
+        for ship in movable_ships:
+            if budget.expired():
                 direction = Direction.Still
+            else:
+                try:
+                    position, direction = self.get_move(ship)
+                except Exception as e:
+                    logging.info(e)
+                    direction = Direction.Still
 
-            self.map[position].mark_unsafe()
-            self.command_queue.append(ship.move(direction))
+            candidates.append((ship, self.rank_moves(ship, direction)))
 
-            # If ship just moved onto the current position of a ship that has
-            # not moved yet, then move that ship next. This ensures the ship
-            # will not end up with no safe moves.
-            existing_ship = self.map[position].ship
-            if existing_ship:
-                j = self.ship_binary_search(movable_ships[i+1:], existing_ship.id)
-                if j > i+1:
-                    temp = movable_ships[i+1]
-                    movable_ships[i+1] = movable_ships[j]
-                    movable_ships[j] = temp
+        # ships may pile onto a dropoff at the end of the game
+        home = [self.map.index(dropoff) for dropoff in self.get_all_dropoffs()] if self.is_end_game else []
+
+        moves = resolve_moves(self.map, stuck + candidates, home)
+        for ship, direction in moves:
+            self.map[ship.position.directional_offset(direction)].mark_unsafe()
+        if moves:
+            self.command_queue.append(commands.serialize_moves([(ship.id, direction) for ship, direction in moves]))
 
 
 def main():
     game = hlt.Game()
     # This is a good place to do computationally expensive start-up pre-processing.
     # As soon as you call "ready" function below, the 2 second per turn timer will start.
-    game.ready("Latest")
     brain = Brain(game)
+    game.watch_deadline()
+    game.ready("Latest")
 
     while True:
         brain.take_turn()
@@ -0,0 +1,7 @@
+"""
+A local Halite III engine speaking the same stdin/stdout protocol as hlt.networking.Game.
+
+Run games with "python3 -m engine"; see engine/__main__.py.
+"""
+from .match import run_match
+from .state import GameState
@@ -0,0 +1,52 @@
+"""
+Command line interface mirroring the official halite executable, e.g.
+
+    python3 -m engine --replay-directory replays/ -vvv --width 32 --height 32 "python3 MyBot.py" "python3 MyBot.py"
+"""
+import argparse
+import json
+import logging
+import sys
+
+from .match import run_match
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m engine', description='Plays a local game of Halite III.')
+    parser.add_argument('bots', nargs='+', help='A shell command starting each bot')
+    parser.add_argument('--width', type=int, default=32, help='The map width')
+    parser.add_argument('--height', type=int, default=32, help='The map height')
+    parser.add_argument('-s', '--seed', type=int, help='The map seed')
+    parser.add_argument('-i', '--replay-directory', default='replays/', help='Where to write replays')
+    parser.add_argument('--no-replay', action='store_true', help='Do not write a replay')
+    parser.add_argument('--no-timeout', action='store_true', help='Give bots unlimited time')
+    parser.add_argument('--turn-limit', type=int, help='Play at most this many turns')
+    parser.add_argument('--results-as-json', action='store_true', help='Print the results as JSON')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='More output; repeat for more')
+    args = parser.parse_args(argv)
+
+    if len(args.bots) not in (1, 2, 4):
+        parser.error('games take 1, 2 or 4 bots')
+
+    logging.basicConfig(level=logging.WARNING - 10 * min(args.verbose, 2), format='%(message)s')
+    overrides = {} if args.turn_limit is None else {'MAX_TURNS': args.turn_limit}
+    timeout = None if args.no_timeout else 2.0
+    results = run_match(args.bots, args.width, args.height, args.seed, args.replay_directory,
+                        write_replay=not args.no_replay, turn_timeout=timeout,
+                        init_timeout=None if args.no_timeout else 30.0, **overrides)
+
+    if args.results_as_json:
+        json.dump(results, sys.stdout)
+        print()
+    else:
+        for player, stats in sorted(results['stats'].items(), key=lambda item: item[1]['rank']):
+            print('Player {}, "{}", was rank {} with {} halite'.format(player, stats['name'], stats['rank'],
+                                                                        stats['score']))
+        if results['replay']:
+            print('Replay written to {}'.format(results['replay']))
+        for player, path in results['error_logs'].items():
+            print('Player {} failed; see {}'.format(player, path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Plays many games in parallel and summarizes how each bot fared, e.g.
+
+    python3 -m engine.batch --bots "python3 MyBot.py" "python3 v6.py" --sizes 32 48 64 --players 2 4 --seeds 1-50
+
+Every combination of map size, player count and seed is played once per
+seating rotation, so each bot plays from each seat. Replays go to a fresh
+directory per batch, and all results are written to one JSON file. With
+--in-process the bots are bot files whose Brains play inside the worker
+processes (see engine.selfplay) rather than shell commands.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+
+from . import selfplay
+from .match import run_match
+
+
+def wilson_interval(successes, trials, z=1.96):
+    """
+    :return: The (low, high) Wilson score interval for a proportion, (0, 1) with no trials
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    centre = p + z * z / (2 * trials)
+    spread = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials))
+    denominator = 1 + z * z / trials
+    return (centre - spread) / denominator, (centre + spread) / denominator
+
+
+def mean_interval(values, z=1.96):
+    """
+    :return: The mean of values and the half-width of its normal confidence interval
+    """
+    if not values:
+        return 0.0, 0.0
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, float('inf')
+    variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    return mean, z * math.sqrt(variance / len(values))
+
+
+def percentile(values, fraction):
+    """
+    :return: The nearest-rank percentile of values, 0 if empty
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)]
+
+
+def parse_seeds(text):
+    """
+    Parses seeds given as "7", "1-50" or "1,5,9"
+    :return: A list of seeds
+    """
+    seeds = []
+    for part in text.split(','):
+        if '-' in part:
+            low, high = part.split('-')
+            seeds += range(int(low), int(high) + 1)
+        else:
+            seeds.append(int(part))
+    return seeds
+
+
+def schedule(bots, sizes, player_counts, seeds):
+    """
+    :return: A list of match dicts, rotating the bots through the seats of each game
+    """
+    matches = []
+    for size in sizes:
+        for players in player_counts:
+            for seed in seeds:
+                for rotation in range(len(bots)):
+                    seats = [bots[(seat + rotation) % len(bots)] for seat in range(players)]
+                    matches.append({'size': size, 'players': players, 'seed': seed, 'seats': seats})
+    return matches
+
+
+def _play(match, replay_directory, turn_timeout, in_process=False):
+    """
+    Plays one scheduled match in a worker process
+    :param in_process: Whether the seats are bot files to play with engine.selfplay
+    :return: The match dict with its results filled in
+    """
+    if in_process:
+        results = selfplay.play(match['seats'], match['size'], match['size'], match['seed'], replay_directory)
+    else:
+        results = run_match(match['seats'], match['size'], match['size'], match['seed'], replay_directory,
+                            turn_timeout=turn_timeout)
+    match = dict(match)
+    match['replay'] = results['replay']
+    match['ranks'] = [results['stats'][str(seat)]['rank'] for seat in range(match['players'])]
+    match['scores'] = [results['stats'][str(seat)]['score'] for seat in range(match['players'])]
+    match['terminated'] = results['terminated']
+    match['error_logs'] = results['error_logs']
+    match['timings'] = [results['timings'][str(seat)] for seat in range(match['players'])]
+    match['turn_times'] = [{'turns': len(times), 'mean': sum(times) / len(times) if times else 0.0,
+                            'p95': percentile(times, 0.95), 'max': max(times, default=0.0)}
+                           for times in match['timings']]
+    return match
+
+
+def summarize(matches):
+    """
+    Aggregates per-bot win rates, ranks, scores and turn times, overall and per (players, size). Turn times are
+    pooled over every turn the bot played, so p95_turn_time is the 95th percentile of single turns.
+    :return: A dict of bot command to statistics
+    """
+    summary = {}
+    for match in matches:
+        for seat, bot in enumerate(match['seats']):
+            for key in ('all', '{}p-{}'.format(match['players'], match['size'])):
+                entry = summary.setdefault(bot, {}).setdefault(key, {'wins': [], 'ranks': [], 'scores': [],
+                                                                     'turn_times': []})
+                entry['wins'].append(match['ranks'][seat] == 1)
+                entry['ranks'].append(match['ranks'][seat])
+                entry['scores'].append(match['scores'][seat])
+                entry['turn_times'] += match['timings'][seat]
+
+    for bot, groups in summary.items():
+        for key, entry in groups.items():
+            games = len(entry['wins'])
+            wins = sum(entry['wins'])
+            rank, rank_error = mean_interval(entry['ranks'])
+            score, score_error = mean_interval(entry['scores'])
+            groups[key] = {
+                'games': games,
+                'win_rate': wins / games,
+                'win_rate_ci': wilson_interval(wins, games),
+                'mean_rank': rank,
+                'mean_rank_ci': rank_error,
+                'mean_score': score,
+                'mean_score_ci': score_error,
+                'turns': len(entry['turn_times']),
+                'mean_turn_time': sum(entry['turn_times']) / len(entry['turn_times']) if entry['turn_times'] else 0.0,
+                'p95_turn_time': percentile(entry['turn_times'], 0.95),
+                'max_turn_time': max(entry['turn_times'], default=0.0),
+            }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m engine.batch', description='Plays many local games in parallel.')
+    parser.add_argument('--bots', nargs='+', required=True, help='A shell command starting each bot')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[32], help='Map sizes to play on')
+    parser.add_argument('--players', nargs='+', type=int, default=[2], choices=(2, 4), help='Player counts')
+    parser.add_argument('--seeds', type=parse_seeds, default=[1], help='Seeds, e.g. 7, 1-50 or 1,5,9')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Games played at once')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Treat --bots as bot files, e.g. MyBot.py, and play them inside the workers')
+    parser.add_argument('--no-timeout', action='store_true', help='Give bots unlimited time')
+    parser.add_argument('--replay-directory', default='replays/', help='Parent of the batch replay directory')
+    parser.add_argument('--results', help='Results file, by default results.json in the batch replay directory')
+    args = parser.parse_args(argv)
+
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    directory = os.path.join(args.replay_directory, 'batch-{}'.format(stamp))
+    suffix = 0
+    while os.path.exists(directory):
+        suffix += 1
+        directory = os.path.join(args.replay_directory, 'batch-{}-{}'.format(stamp, suffix))
+    os.makedirs(directory)
+    results_path = args.results or os.path.join(directory, 'results.json')
+
+    matches = schedule(args.bots, args.sizes, args.players, args.seeds)
+    turn_timeout = None if args.no_timeout else 2.0
+    played = []
+    with multiprocessing.Pool(args.workers) as pool:
+        pending = [pool.apply_async(_play, (match, directory, turn_timeout, args.in_process)) for match in matches]
+        for i, result in enumerate(pending, start=1):
+            played.append(result.get())
+            print('{}/{} games played'.format(i, len(matches)), end='\r', flush=True)
+    print()
+
+    summary = summarize(played)
+    with open(results_path, 'w') as results:
+        json.dump({'bots': args.bots, 'matches': played, 'summary': summary}, results, indent=1)
+
+    for bot, groups in summary.items():
+        overall = groups['all']
+        low, high = overall['win_rate_ci']
+        print('{}: {} games, win rate {:.1%} [{:.1%}, {:.1%}], mean rank {:.2f} +/- {:.2f}, '
+              'mean score {:.0f} +/- {:.0f}, p95 turn {:.3f}s'.format(
+                  bot, overall['games'], overall['win_rate'], low, high, overall['mean_rank'],
+                  overall['mean_rank_ci'], overall['mean_score'], overall['mean_score_ci'],
+                  overall['p95_turn_time']))
+    print('Results written to {}'.format(results_path))
+
+
+if __name__ == '__main__':
+    main()
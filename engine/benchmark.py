@@ -0,0 +1,201 @@
+"""
+Repeatable turn-time benchmarks on recorded games.
+
+The exact input one player received, either rebuilt from a replay or
+taken from a recording made with HALITE_RECORD (see hlt.recording), is fed
+to each bot in a child process, through hlt.networking.Game as in a real game,
+with the bot's commands discarded. The child times every take_turn and
+reports latency percentiles, peak resident memory and allocations, so
+changes to hlt can be compared on identical input, e.g.
+
+    python3 -m engine.benchmark replays/replay-....hlt --player 0 --bots MyBot.py v3.py v4.py v5.py v6.py
+    python3 -m engine.benchmark bot-0.record --bots MyBot.py v6.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from hlt import recording
+from hlt.frame import Frame
+
+from .batch import percentile
+from .protocol import frame_bytes, setup_bytes
+from .replay import ReplayReader
+
+DEFAULT_BOTS = ['MyBot.py', 'v3.py', 'v4.py', 'v5.py', 'v6.py']
+
+
+def replay_input(path, player_id):
+    """
+    Rebuilds the engine input one player received during a recorded game
+    :param path: The replay file
+    :param player_id: The player whose input to rebuild
+    :return: The input, as bytes
+    """
+    reader = ReplayReader(path)
+    header = reader.header
+    shipyards = [(player['factory_location']['x'], player['factory_location']['y'])
+                 for player in sorted(header['players'], key=lambda player: player['player_id'])]
+    parts = [setup_bytes(header['GAME_CONSTANTS'], player_id, shipyards, reader.initial_halite)]
+
+    # Frame t is what bots see on turn t + 1. The last frame follows the last turn, so nobody sees it. The reader
+    # reuses its halite grid, so each frame is encoded as it arrives and sent once the next one shows up.
+    previous = reader.initial_halite.copy()
+    dropoffs = []
+    pending = None
+    for frame in reader:
+        if pending is not None:
+            parts.append(pending)
+        changed = np.flatnonzero(frame.halite != previous)
+        previous.reshape(-1)[changed] = frame.halite.reshape(-1)[changed]
+        cells = np.stack([changed % reader.width, changed // reader.width, previous.reshape(-1)[changed]], axis=1)
+
+        dropoffs += [(event['owner_id'], event['id'], event['location']['x'], event['location']['y'])
+                     for event in frame.events if event['type'] == 'construct']
+        dropoff_rows = np.array(sorted(dropoffs), dtype=np.int64).reshape(-1, 4)
+        players = np.stack([np.arange(reader.num_players),
+                            np.bincount(frame.ships[:, 0], minlength=reader.num_players),
+                            np.bincount(dropoff_rows[:, 0], minlength=reader.num_players),
+                            frame.energy], axis=1)
+        pending = frame_bytes(Frame(frame.turn + 1, players, frame.ships[:, :5], dropoff_rows, cells))
+    return b''.join(parts)
+
+
+def _run_child(bot_path, results_path, trace):
+    """
+    Plays a bot on this process's stdin, discarding its commands, and writes timings to results_path as JSON
+    """
+    import resource
+    import tracemalloc
+
+    from hlt.networking import Game
+
+    from .selfplay import load_bot, take_turn
+
+    sys.stdout = open(os.devnull, 'w')
+    if trace:
+        tracemalloc.start()
+    game = Game()
+    brain = load_bot(bot_path).Brain(game)
+    game.ready(os.path.basename(bot_path))
+
+    turn_times = []
+    error = None
+    blocks = sys.getallocatedblocks()
+    try:
+        while True:
+            start = time.perf_counter()
+            take_turn(brain)
+            turn_times.append(time.perf_counter() - start)
+    except SystemExit:
+        pass
+    except Exception as e:
+        error = repr(e)
+
+    results = {
+        'turn_times': turn_times,
+        'error': error,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'block_growth': sys.getallocatedblocks() - blocks,
+        'traced_peak_bytes': tracemalloc.get_traced_memory()[1] if trace else None,
+    }
+    with open(results_path, 'w') as out:
+        json.dump(results, out)
+
+
+def benchmark(bot_path, stream, trace=False):
+    """
+    Feeds recorded input to a bot in a child process
+    :param bot_path: The bot file
+    :param stream: The input, as bytes
+    :param trace: Whether to measure allocations with tracemalloc, which slows the bot down
+    :return: A dict of turn_times, error, peak_rss_kb, block_growth and traced_peak_bytes
+    """
+    bot_path = os.path.abspath(bot_path)
+    package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, 'input')
+        results_path = os.path.join(directory, 'results.json')
+        with open(input_path, 'wb') as out:
+            out.write(stream)
+        command = [sys.executable, '-m', 'engine.benchmark', '--child', bot_path, results_path]
+        if trace:
+            command.append('--tracemalloc')
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package,
+                                                                               os.environ.get('PYTHONPATH')])))
+        # Run from the scratch directory so the bot's log lands there
+        with open(input_path, 'rb') as stdin:
+            subprocess.run(command, stdin=stdin, cwd=directory, env=environment, check=True)
+        with open(results_path) as results:
+            return json.load(results)
+
+
+def summarize(results):
+    """
+    :return: Latency percentiles in milliseconds and memory figures for one bot's results
+    """
+    times = results['turn_times']
+    return {
+        'turns': len(times),
+        'mean_ms': 1000 * sum(times) / len(times) if times else 0.0,
+        'p50_ms': 1000 * percentile(times, 0.5),
+        'p90_ms': 1000 * percentile(times, 0.9),
+        'p99_ms': 1000 * percentile(times, 0.99),
+        'max_ms': 1000 * max(times, default=0.0),
+        'peak_rss_mb': results['peak_rss_kb'] / 1024,
+        'block_growth': results['block_growth'],
+        'traced_peak_mb': results['traced_peak_bytes'] / 2 ** 20 if results['traced_peak_bytes'] is not None
+        else None,
+        'error': results['error'],
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == '--child':
+        _run_child(argv[1], argv[2], '--tracemalloc' in argv[3:])
+        return
+
+    parser = argparse.ArgumentParser(prog='python3 -m engine.benchmark', description='Times bots on recorded input.')
+    parser.add_argument('replay', help='A replay file, or a recording of one bot\'s input')
+    parser.add_argument('--player', type=int, default=0, help='The player whose input to rebuild from a replay')
+    parser.add_argument('--bots', nargs='+', default=DEFAULT_BOTS, help='Bot files to time')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per bot, pooling their turn times')
+    parser.add_argument('--tracemalloc', action='store_true', help='Also measure peak traced allocations')
+    parser.add_argument('--results-as-json', action='store_true', help='Print the summaries as JSON')
+    args = parser.parse_args(argv)
+
+    if recording.is_recording(args.replay):
+        stream = recording.recorded_input(args.replay)
+    else:
+        stream = replay_input(args.replay, args.player)
+    summaries = {}
+    for bot in args.bots:
+        runs = [benchmark(bot, stream, args.tracemalloc) for _ in range(args.repeat)]
+        pooled = dict(runs[-1])
+        pooled['turn_times'] = [time for run in runs for time in run['turn_times']]
+        pooled['peak_rss_kb'] = max(run['peak_rss_kb'] for run in runs)
+        summaries[bot] = summarize(pooled)
+
+    if args.results_as_json:
+        print(json.dumps(summaries, indent=1))
+        return
+    print('{:<12} {:>6} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9} {:>10}'.format(
+        'bot', 'turns', 'mean ms', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'RSS MB', 'blocks'))
+    for bot, summary in summaries.items():
+        print('{:<12} {turns:>6} {mean_ms:>9.2f} {p50_ms:>9.2f} {p90_ms:>9.2f} {p99_ms:>9.2f} {max_ms:>9.2f} '
+              '{peak_rss_mb:>9.1f} {block_growth:>10}'.format(os.path.basename(bot), **summary))
+        if summary['traced_peak_mb'] is not None:
+            print('{:<12} traced peak {:.1f} MB'.format('', summary['traced_peak_mb']))
+        if summary['error']:
+            print('{:<12} stopped early: {}'.format('', summary['error']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Bot subprocesses, fed over pipes, with each reply timed and bounded from
+when the bot was sent its input.
+"""
+import os
+import selectors
+import subprocess
+import tempfile
+import time
+
+
+class BotError(Exception):
+    """
+    Raised when a bot exits, times out or sends something unreadable.
+    """
+    pass
+
+
+class BotProcess:
+    """
+    A bot launched from a shell command, as the official engine does.
+    """
+    def __init__(self, command, player_id):
+        """
+        :param command: The shell command starting the bot, e.g. "python3 MyBot.py"
+        :param player_id: The bot's player id
+        """
+        self.command = command
+        self.player_id = player_id
+        self.error = None
+        self.sent = time.perf_counter()
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=self._stderr, bufsize=0)
+        self._buffer = b''
+
+    def send(self, data):
+        """
+        Writes input to the bot, noting the time in sent, which its reply is timed from
+        :param data: The bytes to write
+        """
+        self.sent = time.perf_counter()
+        try:
+            self._process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            raise BotError('bot exited')
+
+    def read_line(self, timeout=None):
+        """
+        Reads one line of output from the bot
+        :param timeout: Seconds to allow from the last send, or None to wait forever
+        :return: The line, as str, and the seconds since the last send it took to arrive
+        """
+        result = read_lines([self], timeout)[self]
+        if isinstance(result, BotError):
+            raise result
+        return result
+
+    def _take_line(self):
+        """
+        :return: The first whole line buffered, as str, or None if there is none yet
+        """
+        if b'\n' not in self._buffer:
+            return None
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.decode(errors='replace').rstrip('\r')
+
+    def _read_chunk(self):
+        """
+        Buffers whatever output is waiting, raising BotError if the bot has exited
+        """
+        chunk = os.read(self._process.stdout.fileno(), 1 << 16)
+        if not chunk:
+            raise BotError('bot exited')
+        self._buffer += chunk
+
+    def error_log(self):
+        """
+        :return: Everything the bot wrote to stderr, as str
+        """
+        self._stderr.seek(0)
+        return self._stderr.read().decode(errors='replace')
+
+    def close(self, grace=1.0):
+        """
+        Closes the bot's input so it exits on EOF, killing it if it does not exit in time
+        :param grace: Seconds to wait before killing
+        """
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(grace)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process.stdout.close()
+
+
+def read_lines(bots, timeout=None):
+    """
+    Reads one line from each of several bots, waiting on all of them at once so that every reply is timed from
+    when that bot was sent its input, however slow the others are
+    :param bots: The BotProcesses to read from
+    :param timeout: Seconds each bot has from its last send, or None to wait forever
+    :return: A dict of bot to either its line, as str, and the seconds it took to arrive, or the BotError it failed
+        with
+    """
+    results = {}
+    selector = selectors.DefaultSelector()
+    for bot in bots:
+        line = bot._take_line()
+        if line is not None:
+            results[bot] = (line, time.perf_counter() - bot.sent)
+        else:
+            selector.register(bot._process.stdout, selectors.EVENT_READ, bot)
+
+    while selector.get_map():
+        now = time.perf_counter()
+        waiting = [key.data for key in selector.get_map().values()]
+        if timeout is not None:
+            for bot in waiting:
+                if now - bot.sent >= timeout:
+                    results[bot] = BotError('timed out after {:.3f}s'.format(timeout))
+                    selector.unregister(bot._process.stdout)
+            waiting = [bot for bot in waiting if bot not in results]
+            if not waiting:
+                break
+        remaining = None if timeout is None else min(bot.sent + timeout for bot in waiting) - now
+        for key, _ in selector.select(remaining):
+            bot = key.data
+            arrived = time.perf_counter()
+            try:
+                bot._read_chunk()
+            except BotError as error:
+                results[bot] = error
+                selector.unregister(key.fileobj)
+                continue
+            line = bot._take_line()
+            if line is not None:
+                results[bot] = (line, arrived - bot.sent)
+                selector.unregister(key.fileobj)
+    selector.close()
+    return results
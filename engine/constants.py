@@ -0,0 +1,54 @@
+"""
+The game constants sent to bots, matching the official Halite III engine.
+"""
+
+DEFAULT_CONSTANTS = {
+    'CAPTURE_ENABLED': False,
+    'CAPTURE_RADIUS': 3,
+    'DEFAULT_MAP_HEIGHT': 48,
+    'DEFAULT_MAP_WIDTH': 48,
+    'DROPOFF_COST': 4000,
+    'DROPOFF_PENALTY_RATIO': 4,
+    'EXTRACT_RATIO': 4,
+    'FACTOR_EXP_1': 2.0,
+    'FACTOR_EXP_2': 2.0,
+    'INITIAL_ENERGY': 5000,
+    'INSPIRATION_ENABLED': True,
+    'INSPIRATION_RADIUS': 4,
+    'INSPIRATION_SHIP_COUNT': 2,
+    'INSPIRED_BONUS_MULTIPLIER': 2.0,
+    'INSPIRED_EXTRACT_RATIO': 4,
+    'INSPIRED_MOVE_COST_RATIO': 10,
+    'MAX_CELL_PRODUCTION': 1000,
+    'MAX_ENERGY': 1000,
+    'MAX_PLAYERS': 16,
+    'MAX_TURNS': 400,
+    'MAX_TURN_THRESHOLD': 64,
+    'MIN_CELL_PRODUCTION': 900,
+    'MIN_TURNS': 400,
+    'MIN_TURN_THRESHOLD': 32,
+    'MOVE_COST_RATIO': 10,
+    'NEW_ENTITY_ENERGY_COST': 1000,
+    'PERSISTENCE': 0.7,
+    'SHIPS_ABOVE_FOR_CAPTURE': 3,
+    'STRICT_ERRORS': False,
+}
+
+
+def game_constants(width, height, seed, **overrides):
+    """
+    Builds the constants for one game. MAX_TURNS scales from 400 on 32x32 maps to 500 on 64x64 maps.
+    :param width: The map width
+    :param height: The map height
+    :param seed: The map seed
+    :param overrides: Constants to replace
+    :return: A dict of constants
+    """
+    constants = dict(DEFAULT_CONSTANTS)
+    size = max(width, height)
+    low, high = constants['MIN_TURN_THRESHOLD'], constants['MAX_TURN_THRESHOLD']
+    fraction = min(max((size - low) / (high - low), 0), 1)
+    constants['MAX_TURNS'] = int(constants['MIN_TURNS'] + fraction * 100)
+    constants['game_seed'] = seed
+    constants.update(overrides)
+    return constants
@@ -0,0 +1,274 @@
+"""
+Many independent games stepped together, for parameter sweeps.
+
+engine.state.LockstepGames holds every game's halite, ships, dropoffs and
+players in stacked NumPy arrays and applies each turn's rules to all of
+them at once, by the same code that steps the engine's own games. All games
+share a map size, player count and constants other than the seed, so they
+finish on the same turn.
+
+Each seat is played by a policy which decides that seat's orders in every
+game at once. GreedyPolicy is a cheap fixed heuristic, fast enough for
+thousands of games but unrelated to MyBot's strategy, and BrainPolicy
+plugs in any hlt bot file by running one Brain per game, with any of the
+Brain's attributes overridden. To tune a bot, sweep its Brain; the
+command line sweeps one attribute of either against fixed opponents, e.g.
+
+    python3 -m engine.lockstep --values 600 700 800 900 --seeds 1-500
+    python3 -m engine.lockstep --bot MyBot.py --attribute return_amount --values 700 800 900 --opponent v6.py
+"""
+import argparse
+import ast
+
+import numpy as np
+
+from . import rules
+from .batch import parse_seeds, wilson_interval
+from .protocol import parse_commands
+from .selfplay import InProcessGame, load_bot, take_turn
+from .state import LockstepGames, Orders
+
+
+class GreedyPolicy:
+    """
+    A simple greedy bot, vectorized over every game. It is not MyBot: it has no pull field, ignores
+    inspiration, never builds dropoffs and resolves collisions more crudely, so results swept against or with
+    it say little about MyBot.
+
+    An exploring ship looks only at its four neighbours, moving to the richest when a quarter of that
+    neighbour's halite, less the cost of leaving, beats two more turns of mining where it is. A ship returns to
+    its shipyard once it holds return_amount, when home is as many turns away as are left, or in the end game,
+    taking the cheaper of the moves towards it. Ships which would share a destination are held still, the
+    ship already there or the lowest id keeping it. The shipyard spawns whenever it can afford to and its cell
+    is free, until spawn_cutoff of the game has passed.
+    """
+    def __init__(self, return_amount=800, spawn_cutoff=0.5):
+        """
+        :param return_amount: The cargo at which a ship heads home
+        :param spawn_cutoff: The fraction of the game after which no ships are spawned
+        """
+        self.return_amount = return_amount
+        self.spawn_cutoff = spawn_cutoff
+        self._returning = None
+        self._game_base = None
+
+    def __call__(self, games, player):
+        """
+        :param games: The LockstepGames
+        :param player: The seat to play
+        :return: The seat's Orders
+        """
+        constants = games.constants[0]
+        own = games.ship_owners == player
+        cells = games.ship_cells
+        halite = games._halite
+
+        # Ship ids restart in every game, so remember each ship's status by (game, id)
+        if self._game_base is None:
+            stride = games.num_players * games.max_turns
+            self._game_base = np.arange(games.num_games) * stride
+            self._returning = np.zeros(games.num_games * stride, dtype=bool)
+        keys = self._game_base[games.ship_games] + games.ship_ids
+
+        home = games.shipyard_cells[games.ship_games, player]
+        dx, dy = self._offsets(games, cells, home)
+        distance = np.abs(dx) + np.abs(dy)
+        turns_left = games.max_turns - games.turn_number
+        ships_per_game = np.bincount(games.ship_games[own], minlength=games.num_games)
+        end_game = (ships_per_game >= turns_left)[games.ship_games]
+
+        returning = self._returning[keys] & (distance > 0)
+        returning |= (games.ship_cargo >= self.return_amount) | (distance >= turns_left - 1) | end_game
+        self._returning[keys[own]] = returning[own]
+
+        neighbours = np.stack([rules.move_cells(cells, move, games.width, games.height)
+                               for move in (rules.NORTH, rules.SOUTH, rules.EAST, rules.WEST)])
+
+        # Exploring ships move to the richest neighbour when it beats another turn of mining here
+        richest = np.argmax(halite[neighbours], axis=0)
+        here = halite[cells]
+        move_outlook = halite[neighbours[richest, np.arange(len(cells))]] / 4 - here // 10
+        stay_outlook = here - here * 9 / 16
+        explore = np.where(move_outlook >= stay_outlook, richest, rules.STILL)
+
+        # Returning ships take the cheaper of the one or two moves towards home
+        toward = np.stack([np.where(dy < 0, rules.NORTH, np.where(dy > 0, rules.SOUTH, rules.STILL)),
+                           np.where(dx > 0, rules.EAST, np.where(dx < 0, rules.WEST, rules.STILL))])
+        costs = np.where(toward == rules.STILL, np.iinfo(np.int64).max,
+                         halite[np.where(toward == rules.STILL, cells,
+                                         neighbours[np.minimum(toward, rules.WEST), np.arange(len(cells))])])
+        moves = np.where(returning, toward[np.argmin(costs, axis=0), np.arange(len(cells))], explore)
+        moves[here // 10 > games.ship_cargo] = rules.STILL
+
+        moves = self._avoid_collisions(games, own, moves, end_game)
+
+        shipyard = games.shipyard_cells[:, player]
+        occupied = np.zeros(games.num_games * games.area, dtype=bool)
+        occupied[rules.move_cells(cells[own], moves[own], games.width, games.height)] = True
+        spawns = ((games.energy[:, player] >= constants['NEW_ENTITY_ENERGY_COST']) & ~occupied[shipyard] &
+                  (games.turn_number < games.max_turns * self.spawn_cutoff))
+        return Orders(moves, spawns, None)
+
+    @staticmethod
+    def _offsets(games, cells, targets):
+        """
+        :return: The shortest wrapped (dx, dy) from each cell to its target
+        """
+        local, target = cells % games.area, targets % games.area
+        dx = (target % games.width - local % games.width + games.width // 2) % games.width - games.width // 2
+        dy = (target // games.width - local // games.width + games.height // 2) % games.height - games.height // 2
+        return dx, dy
+
+    @staticmethod
+    def _avoid_collisions(games, own, moves, end_game):
+        """
+        Keeps one ship per destination, the one already there or the one with the lowest id, and holds the
+        rest still until no two ships share a destination. In the end game ships may pile onto the shipyard.
+        :return: The adjusted moves
+        """
+        moves = moves.copy()
+        order = np.flatnonzero(own)
+        yards = set(games.shipyard_cells.reshape(-1).tolist())
+        while True:
+            destinations = rules.move_cells(games.ship_cells[order], moves[order], games.width, games.height)
+            staying = moves[order] == rules.STILL
+            # Sort by destination, staying ships first, then by id
+            ranked = np.lexsort((games.ship_ids[order], ~staying, destinations))
+            sorted_destinations = destinations[ranked]
+            losers = ranked[1:][sorted_destinations[1:] == sorted_destinations[:-1]]
+            if end_game.any():
+                at_yard = np.isin(destinations[losers], list(yards)) & end_game[order[losers]]
+                losers = losers[~at_yard]
+            losers = losers[moves[order[losers]] != rules.STILL]
+            if not len(losers):
+                return moves
+            moves[order[losers]] = rules.STILL
+
+
+class BrainPolicy:
+    """
+    Any bot file's Brain, one per game, driven through engine.selfplay.InProcessGame.
+    """
+    def __init__(self, path, attributes=None):
+        """
+        :param path: The bot file, e.g. MyBot.py
+        :param attributes: A dict of Brain attribute to value, set on every Brain once it is built, e.g.
+            {'return_amount': 700}
+        """
+        self.module = load_bot(path)
+        self.attributes = attributes or {}
+        self._players = None
+
+    def __call__(self, games, player):
+        """
+        :param games: The LockstepGames
+        :param player: The seat to play
+        :return: The seat's Orders
+        """
+        if self._players is None:
+            self._players = []
+            for game in range(games.num_games):
+                view = _GameView(games, game)
+                in_process = InProcessGame(view, player)
+                brain = self.module.Brain(in_process)
+                _set_attributes(brain, self.attributes)
+                self._players.append((in_process, brain))
+
+        moves = np.full(len(games.ship_ids), rules.STILL, dtype=np.int64)
+        constructs = np.zeros(len(games.ship_ids), dtype=bool)
+        spawns = np.zeros(games.num_games, dtype=bool)
+        ship_games = games.ship_games
+        for game, (frame, (in_process, brain)) in enumerate(zip(games.frames(), self._players)):
+            in_process.next_frame = frame
+            take_turn(brain)
+            commands = parse_commands(' '.join(in_process.commands or []))
+            spawns[game] = commands.spawn
+            mine = np.flatnonzero((ship_games == game) & (games.ship_owners == player))
+            index_of = dict(zip(games.ship_ids[mine].tolist(), mine.tolist()))
+            for ship_id, move in commands.moves.items():
+                if ship_id in index_of:
+                    moves[index_of[ship_id]] = move
+            for ship_id in commands.constructs:
+                if ship_id in index_of:
+                    constructs[index_of[ship_id]] = True
+        return Orders(moves, spawns, constructs)
+
+
+class _GameView:
+    """
+    One game of a LockstepGames, with the attributes InProcessGame reads from a GameState.
+    """
+    def __init__(self, games, game):
+        self.constants = games.constants[game]
+        self.shipyards = games.shipyards[game]
+        self.initial_halite = games.initial_halite[game]
+        self.width = games.width
+        self.height = games.height
+
+
+def play(games, policies):
+    """
+    Plays every game to the end
+    :param games: The LockstepGames
+    :param policies: One policy per seat, called as policy(games, player) and returning Orders
+    :return: The (games, players) ranks
+    """
+    while not games.is_over:
+        games.step([policy(games, player) for player, policy in enumerate(policies)])
+    return games.ranks()
+
+
+def _set_attributes(target, attributes):
+    """
+    Overrides existing attributes of a policy or Brain, so that a misspelt name fails rather than being ignored
+    """
+    for name, value in attributes.items():
+        if not hasattr(target, name):
+            raise AttributeError('{} has no attribute {!r}'.format(type(target).__name__, name))
+        setattr(target, name, value)
+
+
+def _parse_value(text):
+    """
+    :return: A command-line value as a Python literal such as 700, 0.5 or True, or else as the string itself
+    """
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m engine.lockstep',
+                                     description="Sweeps one attribute of a bot's Brain, or of GreedyPolicy, against "
+                                                 "fixed opponents.")
+    parser.add_argument('--bot', default=None, help='A bot file whose Brain to sweep, by default GreedyPolicy')
+    parser.add_argument('--attribute', default='return_amount', help='The attribute to sweep')
+    parser.add_argument('--values', nargs='+', type=_parse_value, default=[600, 700, 800, 900, 950],
+                        help='The values to try, as Python literals')
+    parser.add_argument('--opponent', default=None,
+                        help='A bot file to play against, by default GreedyPolicy with return_amount 800')
+    parser.add_argument('--size', type=int, default=32, help='The map width and height')
+    parser.add_argument('--players', type=int, default=2, choices=(2, 4), help='The player count')
+    parser.add_argument('--seeds', type=parse_seeds, default=parse_seeds('1-200'),
+                        help='Seeds, e.g. 7, 1-50 or 1,5,9')
+    args = parser.parse_args(argv)
+
+    for value in args.values:
+        if args.bot:
+            policy = BrainPolicy(args.bot, {args.attribute: value})
+        else:
+            policy = GreedyPolicy()
+            _set_attributes(policy, {args.attribute: value})
+        opponents = [BrainPolicy(args.opponent) if args.opponent else GreedyPolicy()
+                     for _ in range(args.players - 1)]
+        games = LockstepGames.generate(args.size, args.size, args.players, args.seeds)
+        ranks = play(games, [policy] + opponents)
+        wins = int((ranks[:, 0] == 1).sum())
+        low, high = wilson_interval(wins, games.num_games)
+        print('{} {!r}: win rate {:.1%} [{:.1%}, {:.1%}], mean score {:.0f}, mean rank {:.2f}'.format(
+            args.attribute, value, wins / games.num_games, low, high, games.energy[:, 0].mean(), ranks[:, 0].mean()))
+
+
+if __name__ == '__main__':
+    main()
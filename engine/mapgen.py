@@ -0,0 +1,79 @@
+"""
+Symmetric halite maps.
+
+One tile of smooth fractal noise is generated and mirrored so that every
+player starts from an equivalent position: left/right for two players,
+into quadrants for four.
+"""
+import numpy as np
+
+
+def _value_noise(height, width, cell_size, rng):
+    """
+    Random values on a coarse lattice, bilinearly interpolated up to (height, width)
+    """
+    lattice = rng.random((height // cell_size + 2, width // cell_size + 2))
+    y = np.arange(height) / cell_size
+    x = np.arange(width) / cell_size
+    y0 = y.astype(int)[:, np.newaxis]
+    x0 = x.astype(int)[np.newaxis, :]
+    fy = (y - y.astype(int))[:, np.newaxis]
+    fx = (x - x.astype(int))[np.newaxis, :]
+    top = lattice[y0, x0] * (1 - fx) + lattice[y0, x0 + 1] * fx
+    bottom = lattice[y0 + 1, x0] * (1 - fx) + lattice[y0 + 1, x0 + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def _tile_shape(width, height, num_players):
+    """
+    :return: The (tile height, tile width, tiles down, tiles across) for a player count
+    """
+    if num_players == 1:
+        return height, width, 1, 1
+    if num_players == 2:
+        return height, width // 2, 1, 2
+    if num_players == 4:
+        return height // 2, width // 2, 2, 2
+    raise ValueError('Maps support 1, 2 or 4 players, not {}'.format(num_players))
+
+
+def generate_map(width, height, num_players, seed, constants):
+    """
+    Generates the starting halite and shipyard locations for a game.
+    :param width: The map width
+    :param height: The map height
+    :param num_players: The number of players, 1, 2 or 4
+    :param seed: The map seed
+    :param constants: The game constants
+    :return: A (height, width) int64 halite grid and a list of (x, y) shipyard locations, one per player
+    """
+    rng = np.random.default_rng(seed)
+    tile_height, tile_width, down, across = _tile_shape(width, height, num_players)
+
+    noise = np.zeros((tile_height, tile_width))
+    amplitude = 1.0
+    cell_size = max(tile_width, tile_height) // 2
+    while cell_size >= 1:
+        noise += amplitude * _value_noise(tile_height, tile_width, cell_size, rng)
+        amplitude *= constants['PERSISTENCE']
+        cell_size //= 2
+
+    noise = (noise - noise.min()) / max(noise.max() - noise.min(), 1e-9)
+    noise **= constants['FACTOR_EXP_1'] * constants['FACTOR_EXP_2']
+    peak = rng.integers(constants['MIN_CELL_PRODUCTION'], constants['MAX_CELL_PRODUCTION'] + 1)
+    tile = (noise * peak).astype(np.int64)
+
+    halite = np.zeros((height, width), dtype=np.int64)
+    shipyards = []
+    yard_x, yard_y = tile_width // 2, tile_height // 2
+    for row in range(down):
+        for column in range(across):
+            flipped = tile[::-1 if row else 1, ::-1 if column else 1]
+            halite[row * tile_height:(row + 1) * tile_height, column * tile_width:(column + 1) * tile_width] = flipped
+            x = column * tile_width + (tile_width - 1 - yard_x if column else yard_x)
+            y = row * tile_height + (tile_height - 1 - yard_y if row else yard_y)
+            shipyards.append((x, y))
+
+    for x, y in shipyards:
+        halite[y, x] = 0
+    return halite, shipyards
@@ -0,0 +1,153 @@
+"""
+Plays a full game between bot subprocesses.
+"""
+import logging
+import os
+import time
+
+import numpy as np
+
+from .bots import BotError, BotProcess, read_lines
+from .protocol import CommandError, frame_bytes, parse_commands, setup_bytes
+from .replay import ReplayRecorder
+from .state import GameState
+
+
+def run_match(bot_commands, width=32, height=32, seed=None, replay_directory='replays/', write_replay=True,
+              turn_timeout=2.0, init_timeout=30.0, **overrides):
+    """
+    Plays one game.
+    :param bot_commands: A shell command per player, e.g. ["python3 MyBot.py", "python3 v6.py"]
+    :param width: The map width
+    :param height: The map height
+    :param seed: The map seed, random if None
+    :param replay_directory: Where to write the replay and the error logs of failed bots
+    :param write_replay: Whether to write a replay
+    :param turn_timeout: Seconds each bot has per turn, or None for no limit
+    :param init_timeout: Seconds each bot has to get ready, or None for no limit
+    :param overrides: Game constants to replace
+    :return: A results dict in the layout of the official engine's --results-as-json output, with per-turn
+        response times added under "timings"
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % (1 << 31))
+    started = time.perf_counter()
+    state = GameState.generate(width, height, len(bot_commands), seed, **overrides)
+    bots = [BotProcess(command, player) for player, command in enumerate(bot_commands)]
+    names = [command for command in bot_commands]
+    timings = [[] for _ in bots]
+    terminated = {}
+
+    def fail(bot, error):
+        logging.warning('Player %d (%s) failed on turn %d: %s', bot.player_id, bot.command, state.turn_number, error)
+        bot.error = str(error)
+        terminated[str(bot.player_id)] = state.turn_number
+
+    try:
+        for bot in bots:
+            try:
+                bot.send(setup_bytes(state.constants, bot.player_id, state.shipyards, state.initial_halite))
+            except BotError as error:
+                fail(bot, error)
+        for bot, result in read_lines([bot for bot in bots if bot.error is None], init_timeout).items():
+            if isinstance(result, BotError):
+                fail(bot, result)
+            else:
+                names[bot.player_id] = result[0].strip() or names[bot.player_id]
+
+        recorder = ReplayRecorder(state, names) if write_replay else None
+        while not state.is_over and any(bot.error is None for bot in bots):
+            data = frame_bytes(state.frame())
+            live = [bot for bot in bots if bot.error is None]
+            for bot in live:
+                try:
+                    bot.send(data)
+                except BotError as error:
+                    fail(bot, error)
+
+            # Every bot is timed from its own send, and all are read at once so none waits on another
+            commands = [None] * len(bots)
+            replies = read_lines([bot for bot in live if bot.error is None], turn_timeout)
+            for bot in live:
+                result = replies.get(bot)
+                if result is None:
+                    continue
+                if isinstance(result, BotError):
+                    fail(bot, result)
+                    continue
+                line, elapsed = result
+                try:
+                    commands[bot.player_id] = parse_commands(line)
+                except CommandError as error:
+                    fail(bot, error)
+                    continue
+                timings[bot.player_id].append(elapsed)
+
+            events = state.step(commands)
+            if recorder is not None:
+                recorder.record(commands, events)
+    finally:
+        for bot in bots:
+            bot.close()
+
+    statistics, stats = final_standings(state, terminated, names)
+    error_logs = {}
+    replay = None
+    if write_replay:
+        replay = recorder.write(replay_directory, statistics)
+    for bot in bots:
+        if bot.error is not None:
+            error_logs[str(bot.player_id)] = _write_error_log(replay_directory, seed, bot)
+
+    return {
+        'error_logs': error_logs,
+        'execution_time': int((time.perf_counter() - started) * 1000),
+        'map_generator': 'fractal-mirror',
+        'map_height': height,
+        'map_seed': seed,
+        'map_width': width,
+        'replay': replay,
+        'stats': stats,
+        'terminated': terminated,
+        'timings': {str(player): timings[player] for player in range(len(bots))},
+    }
+
+
+def final_standings(state, terminated, names):
+    """
+    Ranks the players of a finished game. Failed bots rank behind every bot which finished, earliest failure last.
+    :param state: The GameState at the end of the game
+    :param terminated: A dict of str player id to the turn on which that player failed
+    :param names: Each player's name
+    :return: The statistics dict written to the replay, and the per-player "stats" dict of the results
+    """
+    players = range(len(names))
+    ranks = state.ranks()
+    failed = sorted(terminated, key=lambda player: terminated[player], reverse=True)
+    finished = [player for player in sorted(players, key=lambda player: ranks[player]) if str(player) not in terminated]
+    for rank, player in enumerate(finished + [int(player) for player in failed], start=1):
+        ranks[player] = rank
+
+    statistics = {
+        'number_turns': state.turn_number,
+        'player_statistics': [{'player_id': player, 'rank': ranks[player],
+                               'final_production': int(state.energy[player]),
+                               'total_production': int(state.deposited[player])}
+                              for player in players],
+    }
+    stats = {str(player): {'name': names[player], 'rank': ranks[player], 'score': int(state.energy[player])}
+             for player in players}
+    return statistics, stats
+
+
+def _write_error_log(directory, seed, bot):
+    """
+    Saves a failed bot's stderr next to the replays
+    :return: The path written
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'errorlog-{}-{}-{}.log'.format(time.strftime('%Y%m%d-%H%M%S%z'), seed,
+                                                                   bot.player_id))
+    with open(path, 'a') as log:
+        log.write('{}\n{}'.format(bot.error, bot.error_log()))
+    return path
@@ -0,0 +1,108 @@
+"""
+The text protocol spoken between the engine and bots, as read by hlt.networking.Game.
+"""
+import json
+from collections import namedtuple
+
+from .rules import MOVE_CODES
+
+Commands = namedtuple('Commands', ['spawn', 'constructs', 'moves'])
+Commands.__doc__ = """
+One player's commands for a turn: whether to spawn, the set of ship ids to
+convert into dropoffs, and a dict of ship id to move code.
+"""
+
+
+class CommandError(Exception):
+    """
+    Raised for a command line the engine cannot accept.
+    """
+    pass
+
+
+def parse_commands(line):
+    """
+    Parses the command line a bot sent for one turn
+    :param line: The line, as str
+    :return: The Commands
+    """
+    tokens = line.split()
+    spawn = False
+    constructs = set()
+    moves = {}
+    issued = set()
+    i = 0
+    while i < len(tokens):
+        command = tokens[i]
+        try:
+            if command == 'g':
+                if spawn:
+                    raise CommandError('More than one spawn command')
+                spawn = True
+                i += 1
+                continue
+            ship_id = int(tokens[i + 1])
+            if command == 'c':
+                i += 2
+            elif command == 'm':
+                moves[ship_id] = MOVE_CODES[tokens[i + 2]]
+                i += 3
+            else:
+                raise CommandError('Unknown command {!r}'.format(command))
+        except (IndexError, KeyError, ValueError):
+            raise CommandError('Malformed command at {!r}'.format(' '.join(tokens[i:i + 3])))
+        if ship_id in issued:
+            raise CommandError('More than one command for ship {}'.format(ship_id))
+        issued.add(ship_id)
+        if command == 'c':
+            constructs.add(ship_id)
+    return Commands(spawn, constructs, moves)
+
+
+def format_commands(commands):
+    """
+    The inverse of parse_commands
+    :param commands: The Commands
+    :return: The command line, as str
+    """
+    parts = ['g'] if commands.spawn else []
+    parts += ['c {}'.format(ship_id) for ship_id in sorted(commands.constructs)]
+    parts += ['m {} {}'.format(ship_id, 'nsewo'[move]) for ship_id, move in sorted(commands.moves.items())]
+    return ' '.join(parts)
+
+
+def setup_bytes(constants, player_id, shipyards, halite):
+    """
+    Serializes the pre-game input for one bot
+    :param constants: The game constants
+    :param player_id: The bot's player id
+    :param shipyards: A list of (x, y) shipyard locations, one per player
+    :param halite: The (height, width) starting halite grid
+    :return: The bytes to write to the bot
+    """
+    lines = [json.dumps(constants), '{} {}'.format(len(shipyards), player_id)]
+    lines += ['{} {} {}'.format(player, x, y) for player, (x, y) in enumerate(shipyards)]
+    lines.append('{} {}'.format(halite.shape[1], halite.shape[0]))
+    lines += [' '.join(map(str, row)) for row in halite.tolist()]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def frame_bytes(frame):
+    """
+    Serializes a turn for the bots
+    :param frame: An hlt.frame.Frame
+    :return: The bytes to write to every bot
+    """
+    lines = [str(frame.turn_number)]
+    ships = frame.ships.tolist()
+    dropoffs = frame.dropoffs.tolist()
+    ship_start = dropoff_start = 0
+    for player, num_ships, num_dropoffs, halite in frame.players.tolist():
+        lines.append('{} {} {} {}'.format(player, num_ships, num_dropoffs, halite))
+        lines += ['{} {} {} {}'.format(*ship[1:]) for ship in ships[ship_start:ship_start + num_ships]]
+        lines += ['{} {} {}'.format(*dropoff[1:]) for dropoff in dropoffs[dropoff_start:dropoff_start + num_dropoffs]]
+        ship_start += num_ships
+        dropoff_start += num_dropoffs
+    lines.append(str(len(frame.cells)))
+    lines += ['{} {} {}'.format(*cell) for cell in frame.cells.tolist()]
+    return ('\n'.join(lines) + '\n').encode()
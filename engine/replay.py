@@ -0,0 +1,395 @@
+"""
+Replay files in the layout of the official engine's .hlt replays.
+
+full_frames[0] holds the state bots see on turn 1. full_frames[t] holds the
+commands sent on turn t ("moves"), what they caused ("events"), the cells
+changed by them ("cells"), and the resulting ships and halite, which are
+what bots see on turn t + 1.
+
+Replays are zstd-compressed JSON when the zstandard package is installed,
+as the official engine writes them, and gzip-compressed otherwise.
+
+ReplayReader reads replays back a frame at a time, from zstd, gzip or
+plain JSON, without holding the whole document: the JSON is decoded value
+by value from a stream of chunks, so only one frame is in memory at once.
+convert_replay writes a replay out as a directory of .npy columns, which
+ReplayCache memory-maps, for scanning many replays repeatedly.
+"""
+import gzip
+import io
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ENGINE_VERSION = 'python-local'
+REPLAY_FILE_VERSION = 3
+
+
+class ReplayRecorder:
+    """
+    Accumulates the frames of a game in progress.
+    """
+    def __init__(self, state, names):
+        """
+        :param state: The engine.state.GameState, before the first turn
+        :param names: The bots' names, indexed by player id
+        """
+        self.state = state
+        self.names = names
+        self._halite = state.halite.reshape(-1).copy()
+        self.frames = [self._frame([], {})]
+
+    def _frame(self, events, moves):
+        """
+        Snapshots the state's ships, energy and changed cells
+        """
+        state = self.state
+        halite = state.halite.reshape(-1)
+        changed = np.flatnonzero(halite != self._halite)
+        self._halite[changed] = halite[changed]
+
+        entities = {str(player): {} for player in range(state.num_players)}
+        for ship_id, owner, cell, cargo, inspired in zip(state.ship_ids.tolist(), state.ship_owners.tolist(),
+                                                         state.ship_cells.tolist(), state.ship_cargo.tolist(),
+                                                         state.ship_inspired.tolist()):
+            entities[str(owner)][str(ship_id)] = {'x': cell % state.width, 'y': cell // state.width,
+                                                  'energy': cargo, 'is_inspired': inspired}
+        return {
+            'cells': [{'x': cell % state.width, 'y': cell // state.width, 'production': int(halite[cell])}
+                      for cell in changed.tolist()],
+            'deposited': {str(player): int(amount) for player, amount in enumerate(state.deposited)},
+            'energy': {str(player): int(amount) for player, amount in enumerate(state.energy)},
+            'entities': entities,
+            'events': events,
+            'moves': moves,
+        }
+
+    def record(self, commands, events):
+        """
+        Adds the frame for the turn just stepped
+        :param commands: The engine.protocol.Commands (or None) played by each player
+        :param events: The events returned by GameState.step
+        """
+        moves = {}
+        for player, command in enumerate(commands):
+            if command is None:
+                continue
+            player_moves = [{'type': 'g'}] if command.spawn else []
+            player_moves += [{'type': 'c', 'id': ship_id} for ship_id in sorted(command.constructs)]
+            player_moves += [{'type': 'm', 'id': ship_id, 'direction': 'nsewo'[move]}
+                             for ship_id, move in sorted(command.moves.items())]
+            moves[str(player)] = player_moves
+        self.frames.append(self._frame(events, moves))
+
+    def to_json(self, statistics):
+        """
+        :param statistics: The game_statistics section
+        :return: The replay as a JSON-serializable dict
+        """
+        state = self.state
+        return {
+            'ENGINE_VERSION': ENGINE_VERSION,
+            'GAME_CONSTANTS': state.constants,
+            'REPLAY_FILE_VERSION': REPLAY_FILE_VERSION,
+            'map_generator_seed': state.constants.get('game_seed'),
+            'number_of_players': state.num_players,
+            'players': [{'player_id': player, 'name': self.names[player],
+                         'energy': state.constants['INITIAL_ENERGY'], 'entities': [],
+                         'factory_location': {'x': x, 'y': y}}
+                        for player, (x, y) in enumerate(state.shipyards)],
+            'production_map': {'width': state.width, 'height': state.height, 'map_generator': 'fractal-mirror',
+                               'grid': [[{'energy': amount} for amount in row]
+                                        for row in state.initial_halite.tolist()]},
+            'game_statistics': statistics,
+            'full_frames': self.frames,
+        }
+
+    def write(self, directory, statistics):
+        """
+        Writes the replay to a new file, never overwriting an existing one
+        :param directory: The directory to write into, created if needed
+        :param statistics: The game_statistics section
+        :return: The path written
+        """
+        os.makedirs(directory, exist_ok=True)
+        state = self.state
+        stem = 'replay-{}-{}-{}-{}'.format(time.strftime('%Y%m%d-%H%M%S%z'), state.constants.get('game_seed'),
+                                           state.width, state.height)
+        data = json.dumps(self.to_json(statistics)).encode()
+        data = zstandard.ZstdCompressor().compress(data) if zstandard else gzip.compress(data)
+
+        suffix = 0
+        while True:
+            path = os.path.join(directory, '{}{}.hlt'.format(stem, '-{}'.format(suffix) if suffix else ''))
+            try:
+                with open(path, 'xb') as replay:
+                    replay.write(data)
+                return path
+            except FileExistsError:
+                suffix += 1
+
+
+ReplayFrame = namedtuple('ReplayFrame', ['turn', 'halite', 'ships', 'energy', 'deposited', 'events', 'moves'])
+ReplayFrame.__doc__ = """
+The state after one frame of a replay. turn is the frame's index into
+full_frames, so frame t shows what bots see on turn t + 1. halite is the
+(height, width) grid, ships has rows of (owner, id, x, y, cargo, inspired)
+sorted by owner and id, and energy and deposited are indexed by player.
+events and moves are as stored in the replay. The halite grid is updated in
+place for the next frame; copy it to keep it.
+"""
+
+# Leading bytes of each compression format
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_GZIP_MAGIC = b'\x1f\x8b'
+# Characters of JSON read at a time
+CHUNK_SIZE = 1 << 20
+
+
+def open_replay(path):
+    """
+    Opens a replay for reading as text, decompressing it on the fly
+    :param path: A zstd-compressed, gzip-compressed or plain JSON replay
+    :return: A text stream
+    """
+    raw = open(path, 'rb')
+    magic = raw.read(4)
+    raw.seek(0)
+    if magic.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raw.close()
+            raise RuntimeError('Reading {} needs the zstandard package'.format(path))
+        binary = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    elif magic.startswith(_GZIP_MAGIC):
+        binary = gzip.GzipFile(fileobj=raw, mode='rb')
+        binary.myfileobj = raw
+    else:
+        binary = raw
+    return io.TextIOWrapper(io.BufferedReader(binary) if not hasattr(binary, 'peek') else binary, encoding='utf-8')
+
+
+class _JsonStream:
+    """
+    Decodes a JSON document value by value from a text stream, reading chunks only as needed.
+    """
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, text):
+        self.text = text
+        self.buffer = ''
+        self.position = 0
+
+    def _fill(self):
+        """
+        Reads another chunk, dropping what has been consumed
+        :return: Whether there was more to read
+        """
+        more = self.text.read(CHUNK_SIZE)
+        if not more:
+            return False
+        self.buffer = self.buffer[self.position:] + more
+        self.position = 0
+        return True
+
+    def peek(self):
+        """
+        :return: The next character which is not whitespace, without consuming it, or '' at the end
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n':
+                self.position += 1
+            if self.position < len(self.buffer) or not self._fill():
+                return self.buffer[self.position:self.position + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected {!r} in replay at {!r}'.format(char, self.buffer[self.position:][:40]))
+        self.position += 1
+
+    def value(self):
+        """
+        :return: The next complete JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number running to the end of the buffer may continue in the next chunk
+            if end < len(self.buffer) or not self._fill():
+                self.position = end
+                return value
+
+    def members(self):
+        """
+        Walks the keys of an object, leaving each value for the caller to consume
+        :return: An iterator of keys
+        """
+        self.expect('{')
+        while self.peek() != '}':
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.position += 1
+        self.position += 1
+
+    def elements(self):
+        """
+        :return: An iterator over the values of an array
+        """
+        self.expect('[')
+        while self.peek() != ']':
+            yield self.value()
+            if self.peek() == ',':
+                self.position += 1
+        self.position += 1
+
+
+class ReplayReader:
+    """
+    Streams the frames of a replay file.
+    """
+    def __init__(self, path):
+        """
+        Reads everything but the frames. If the production map comes after the frames, as the official engine
+        writes it, this means a first pass over the file decoding and dropping each frame.
+        :param path: The replay file
+        """
+        self.path = path
+        self.header = {}
+        with open_replay(path) as text:
+            stream = _JsonStream(text)
+            for key in stream.members():
+                if key == 'full_frames':
+                    for _ in stream.elements():
+                        pass
+                else:
+                    self.header[key] = stream.value()
+                    if key == 'production_map' and 'full_frames' not in self.header:
+                        break
+
+        production = self.header['production_map']
+        self.width = production['width']
+        self.height = production['height']
+        self.num_players = self.header['number_of_players']
+        self.initial_halite = np.array([[cell['energy'] for cell in row] for row in production['grid']],
+                                       dtype=np.int64)
+
+    def __iter__(self):
+        """
+        :return: An iterator of ReplayFrame
+        """
+        halite = self.initial_halite.copy()
+        players = range(self.num_players)
+        with open_replay(self.path) as text:
+            stream = _JsonStream(text)
+            for key in stream.members():
+                if key != 'full_frames':
+                    stream.value()
+                    continue
+                for turn, frame in enumerate(stream.elements()):
+                    for cell in frame['cells']:
+                        halite[cell['y'], cell['x']] = cell['production']
+                    ships = [(int(owner), int(ship_id), ship['x'], ship['y'], ship['energy'], ship['is_inspired'])
+                             for owner, owner_ships in frame['entities'].items()
+                             for ship_id, ship in owner_ships.items()]
+                    ships = np.array(sorted(ships), dtype=np.int64).reshape(-1, 6)
+                    yield ReplayFrame(turn, halite, ships,
+                                      np.array([frame['energy'].get(str(player), 0) for player in players]),
+                                      np.array([frame['deposited'].get(str(player), 0) for player in players]),
+                                      frame.get('events', []), frame.get('moves', {}))
+                return
+
+
+def convert_replay(path, directory):
+    """
+    Writes a replay as a columnar cache for ReplayCache: one .npy file per column, plus the header
+    and each frame's events and moves as JSON
+    :param path: The replay file
+    :param directory: The cache directory to create
+    :return: The directory
+    """
+    reader = ReplayReader(path)
+    os.makedirs(directory, exist_ok=True)
+    ships, ship_counts, cells, cell_counts, energy, deposited, events = [], [], [], [], [], [], []
+    previous = reader.initial_halite.copy()
+    for frame in reader:
+        changed = np.flatnonzero(frame.halite != previous)
+        previous.reshape(-1)[changed] = frame.halite.reshape(-1)[changed]
+        cells.append(np.stack([changed % reader.width, changed // reader.width, previous.reshape(-1)[changed]],
+                              axis=1))
+        cell_counts.append(len(changed))
+        ships.append(frame.ships)
+        ship_counts.append(len(frame.ships))
+        energy.append(frame.energy)
+        deposited.append(frame.deposited)
+        events.append({'events': frame.events, 'moves': frame.moves})
+
+    columns = {
+        'initial_halite': reader.initial_halite,
+        'ships': np.concatenate(ships).reshape(-1, 6),
+        'ship_offsets': np.concatenate([[0], np.cumsum(ship_counts)]),
+        'cells': np.concatenate(cells).reshape(-1, 3),
+        'cell_offsets': np.concatenate([[0], np.cumsum(cell_counts)]),
+        'energy': np.array(energy, dtype=np.int64).reshape(-1, reader.num_players),
+        'deposited': np.array(deposited, dtype=np.int64).reshape(-1, reader.num_players),
+    }
+    for name, column in columns.items():
+        np.save(os.path.join(directory, name + '.npy'), column)
+    with open(os.path.join(directory, 'header.json'), 'w') as header:
+        json.dump({key: value for key, value in reader.header.items() if key != 'production_map'}, header)
+    with open(os.path.join(directory, 'events.json'), 'w') as out:
+        json.dump(events, out)
+    return directory
+
+
+class ReplayCache:
+    """
+    A replay converted by convert_replay, with its columns memory-mapped.
+    """
+    def __init__(self, directory):
+        """
+        :param directory: The cache directory
+        """
+        self.directory = directory
+        for name in ('initial_halite', 'ships', 'ship_offsets', 'cells', 'cell_offsets', 'energy', 'deposited'):
+            setattr(self, name, np.load(os.path.join(directory, name + '.npy'), mmap_mode='r'))
+        with open(os.path.join(directory, 'header.json')) as header:
+            self.header = json.load(header)
+        self.height, self.width = self.initial_halite.shape
+        self.num_players = self.energy.shape[1]
+
+    def __len__(self):
+        return len(self.energy)
+
+    def events(self):
+        """
+        :return: A list per frame of {'events': ..., 'moves': ...}, loaded on demand
+        """
+        with open(os.path.join(self.directory, 'events.json')) as events:
+            return json.load(events)
+
+    def __iter__(self):
+        """
+        :return: An iterator of ReplayFrame, whose ships are views into the mapped columns, and with empty
+            events and moves (see events)
+        """
+        halite = np.array(self.initial_halite)
+        for turn in range(len(self)):
+            cells = self.cells[self.cell_offsets[turn]:self.cell_offsets[turn + 1]]
+            halite[cells[:, 1], cells[:, 0]] = cells[:, 2]
+            yield ReplayFrame(turn, halite, self.ships[self.ship_offsets[turn]:self.ship_offsets[turn + 1]],
+                              self.energy[turn], self.deposited[turn], [], {})
@@ -0,0 +1,83 @@
+"""
+Rule kernels shared by every way of stepping a game.
+
+Ships are held as parallel arrays (owner, cell, cargo, ...) and cells by
+flat index, so the same functions step a single game or many stacked games
+whose cells are numbered game * width * height + y * width + x.
+"""
+import numpy as np
+
+# Moves in the order of hlt.game_map.MOVES
+NORTH, SOUTH, EAST, WEST, STILL = range(5)
+STEP_X = np.array([0, 0, 1, -1, 0])
+STEP_Y = np.array([-1, 1, 0, 0, 0])
+MOVE_CODES = {'n': NORTH, 's': SOUTH, 'e': EAST, 'w': WEST, 'o': STILL}
+
+
+def move_cells(cells, moves, width, height):
+    """
+    :param cells: Flat cell index of each ship
+    :param moves: Move code of each ship
+    :param width: The map width
+    :param height: The map height
+    :return: The flat cell index each ship moves to, wrapping around its own map
+    """
+    area = width * height
+    local = cells % area
+    x = (local % width + STEP_X[moves]) % width
+    y = (local // width + STEP_Y[moves]) % height
+    return cells - local + y * width + x
+
+
+def move_costs(halite, cells, inspired, constants):
+    """
+    :param halite: Flat halite of every cell
+    :param cells: Flat cell index of each ship
+    :param inspired: Whether each ship is inspired
+    :param constants: The game constants
+    :return: The halite each ship must spend to leave its cell
+    """
+    ratio = np.where(inspired, constants['INSPIRED_MOVE_COST_RATIO'], constants['MOVE_COST_RATIO'])
+    return halite[cells] // ratio
+
+
+def collided(cells):
+    """
+    :param cells: Flat cell index of each ship
+    :return: Whether each ship shares its cell with another ship
+    """
+    if not len(cells):
+        return np.zeros(0, dtype=bool)
+    _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    return counts[inverse] > 1
+
+
+def extract(halite, cells, cargo, inspired, constants):
+    """
+    Works out mining for ships which stayed still. At most one ship may be in each cell.
+    :param halite: Flat halite of every cell
+    :param cells: Flat cell index of each mining ship
+    :param cargo: Cargo of each mining ship
+    :param inspired: Whether each mining ship is inspired
+    :param constants: The game constants
+    :return: The halite removed from each ship's cell, and the halite added to each ship's cargo
+    """
+    ratio = np.where(inspired, constants['INSPIRED_EXTRACT_RATIO'], constants['EXTRACT_RATIO'])
+    space = constants['MAX_ENERGY'] - cargo
+    taken = np.minimum(-(-halite[cells] // ratio), space)
+    bonus = np.where(inspired, (taken * constants['INSPIRED_BONUS_MULTIPLIER']).astype(np.int64), 0)
+    return taken, np.minimum(taken + bonus, space)
+
+
+def inspired(counts, owners, cells, constants):
+    """
+    :param counts: Per-player ship counts in inspiration range, shape (players, cells), as from InspirationField.counts
+    :param owners: Owner of each ship
+    :param cells: Flat cell index of each ship
+    :param constants: The game constants
+    :return: Whether each ship is inspired
+    """
+    if not constants['INSPIRATION_ENABLED'] or not len(cells):
+        return np.zeros(len(cells), dtype=bool)
+    opponents = counts[:, cells].sum(axis=0) - counts[owners, cells]
+    return opponents >= constants['INSPIRATION_SHIP_COUNT']
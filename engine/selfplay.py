@@ -0,0 +1,164 @@
+"""
+Games played entirely inside one process.
+
+Each bot's Brain drives an InProcessGame, an hlt.Game whose frames come
+straight from the engine's GameState and whose end_turn hands the command
+list back instead of printing it. Nothing is serialized and no interpreter
+is started per bot, so tuning runs fit many more games per core, e.g.
+
+    python3 -m engine.batch --in-process --bots MyBot.py v6.py --seeds 1-50
+"""
+import importlib.util
+import os
+import random
+import time
+import traceback
+
+from hlt import constants
+from hlt.deadline import TurnClock
+from hlt.entity import Shipyard
+from hlt.game_map import GameMap, Player
+from hlt.logs import TurnThrottle
+from hlt.networking import Game
+
+from .match import final_standings
+from .protocol import parse_commands
+from .replay import ReplayRecorder
+from .state import GameState
+
+_modules = {}
+
+
+class InProcessGame(Game):
+    """
+    An hlt.Game set up from, and fed by, an engine GameState.
+    """
+    def __init__(self, state, player_id):
+        """
+        :param state: The engine.state.GameState, before the first turn
+        :param player_id: The player this game is seen by
+        """
+        self.turn_number = 0
+        constants.load_constants(state.constants)
+        self.my_id = player_id
+        self.game_map = GameMap(state.initial_halite, state.width, state.height)
+        self.players = {player: Player(player, Shipyard(player, -1, self.game_map.positions.at(x, y)))
+                        for player, (x, y) in enumerate(state.shipyards)}
+        self.me = self.players[player_id]
+
+        self.clock = TurnClock()
+        self.watchdog = None
+        self.log_throttle = TurnThrottle()
+        self.name = None
+        self.next_frame = None
+        self.commands = None
+
+    def ready(self, name):
+        self.name = name
+
+    def update_frame(self, frame=None):
+        """
+        Applies the frame injected by the harness, or the given one
+        """
+        super().update_frame(self.next_frame if frame is None else frame)
+
+    def end_turn(self, commands):
+        """
+        Captures the turn's commands for the harness
+        """
+        self.commands = commands
+
+
+def load_bot(path):
+    """
+    Imports a bot file such as MyBot.py without running its main()
+    :param path: The path to the bot's file
+    :return: The module
+    """
+    path = os.path.abspath(path)
+    if path not in _modules:
+        name = 'selfplay_{}_{}'.format(len(_modules), os.path.splitext(os.path.basename(path))[0])
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[path] = module
+    return _modules[path]
+
+
+def take_turn(brain):
+    """
+    Plays one turn of a Brain, whether or not it has a take_turn method
+    """
+    if hasattr(brain, 'take_turn'):
+        brain.take_turn()
+    else:
+        brain.start_turn()
+        brain.move_ships()
+        brain.spawn()
+        brain.end_turn()
+
+
+def play(bot_paths, width=32, height=32, seed=None, replay_directory=None, **overrides):
+    """
+    Plays one game with every bot's Brain in this process.
+    :param bot_paths: The path of each player's bot file
+    :param width: The map width
+    :param height: The map height
+    :param seed: The map seed, also used to seed the bots' random module
+    :param replay_directory: Where to write a replay, or None for no replay
+    :param overrides: Game constants to replace
+    :return: A results dict like engine.match.run_match's, except that error_logs holds the traceback of each
+        bot which raised rather than the path of a log file
+    """
+    seed = random.randrange(1 << 31) if seed is None else seed
+    random.seed(seed)
+    started = time.perf_counter()
+    state = GameState.generate(width, height, len(bot_paths), seed, **overrides)
+
+    games = []
+    brains = []
+    for player, path in enumerate(bot_paths):
+        game = InProcessGame(state, player)
+        brains.append(load_bot(path).Brain(game))
+        game.name = game.name or os.path.splitext(os.path.basename(path))[0]
+        games.append(game)
+
+    recorder = ReplayRecorder(state, [game.name for game in games]) if replay_directory else None
+    timings = [[] for _ in games]
+    terminated = {}
+    error_logs = {}
+    while not state.is_over and len(terminated) < len(games):
+        frame = state.frame()
+        commands = [None] * len(games)
+        for player, (game, brain) in enumerate(zip(games, brains)):
+            if str(player) in terminated:
+                continue
+            game.next_frame = frame
+            game.commands = None
+            turn_start = time.perf_counter()
+            try:
+                take_turn(brain)
+                commands[player] = parse_commands(' '.join(game.commands or []))
+            except Exception:
+                terminated[str(player)] = state.turn_number
+                error_logs[str(player)] = traceback.format_exc()
+                continue
+            timings[player].append(time.perf_counter() - turn_start)
+
+        events = state.step(commands)
+        if recorder is not None:
+            recorder.record(commands, events)
+
+    statistics, stats = final_standings(state, terminated, [game.name for game in games])
+    return {
+        'error_logs': error_logs,
+        'execution_time': int((time.perf_counter() - started) * 1000),
+        'map_height': height,
+        'map_seed': seed,
+        'map_width': width,
+        'replay': recorder.write(replay_directory, statistics) if recorder is not None else None,
+        'stats': stats,
+        'terminated': terminated,
+        'timings': {str(player): timings[player] for player in range(len(games))},
+    }
+
@@ -0,0 +1,403 @@
+"""
+The authoritative state of games, stepped turn by turn.
+
+LockstepGames holds any number of independent games of one map size and
+player count in stacked NumPy arrays, with cells numbered
+game * width * height + y * width + x, and applies each turn's rules to all
+of them at once with the kernels in engine.rules. GameState is a single
+game played by the engine and engine.selfplay, and steps through a
+one-game LockstepGames, so both follow the same rules.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from hlt.frame import Frame
+from hlt.inspiration import InspirationField
+
+from . import rules
+from .constants import game_constants
+from .mapgen import generate_map
+
+Orders = namedtuple('Orders', ['moves', 'spawns', 'constructs'])
+Orders.__doc__ = """
+One seat's orders in every game for a turn: a move code for each of the
+batch's ships, a spawn flag for each game, and a flag for each ship to
+convert into a dropoff. Entries for other seats' ships are ignored, and
+constructs may be None.
+"""
+
+
+class LockstepGames:
+    """
+    The state of many games of the same size and player count.
+    """
+    def __init__(self, constants, halite, shipyards):
+        """
+        :param constants: The game constants of each game
+        :param halite: The (games, height, width) starting halite grids
+        :param shipyards: A list per game of (x, y) shipyard locations, one per player
+        """
+        self.constants = constants
+        self.num_games, self.height, self.width = halite.shape
+        self.num_players = len(shipyards[0])
+        self.area = self.width * self.height
+        self.max_turns = constants[0]['MAX_TURNS']
+        self.shipyards = [list(game) for game in shipyards]
+        self.initial_halite = np.array(halite, dtype=np.int64)
+
+        self.halite = self.initial_halite.copy()
+        self._halite = self.halite.reshape(-1)
+        self._last_sent = self._halite.copy()
+        self._frames = None
+        self.turn_number = 0
+
+        self.energy = np.full((self.num_games, self.num_players), constants[0]['INITIAL_ENERGY'], dtype=np.int64)
+        self.deposited = np.zeros((self.num_games, self.num_players), dtype=np.int64)
+        self.energy_history = []
+
+        self.ship_ids = np.zeros(0, dtype=np.int64)
+        self.ship_owners = np.zeros(0, dtype=np.int64)
+        self.ship_cells = np.zeros(0, dtype=np.int64)
+        self.ship_cargo = np.zeros(0, dtype=np.int64)
+        self.ship_inspired = np.zeros(0, dtype=bool)
+        self._next_ship_id = np.zeros(self.num_games, dtype=np.int64)
+
+        self.dropoff_ids = np.zeros(0, dtype=np.int64)
+        self.dropoff_owners = np.zeros(0, dtype=np.int64)
+        self.dropoff_cells = np.zeros(0, dtype=np.int64)
+        self._next_dropoff_id = np.zeros(self.num_games, dtype=np.int64)
+
+        self.structure_owner = np.full(self.num_games * self.area, -1, dtype=np.int64)
+        self.shipyard_cells = np.array([[game * self.area + y * self.width + x for x, y in yards]
+                                        for game, yards in enumerate(self.shipyards)], dtype=np.int64)
+        self.structure_owner[self.shipyard_cells] = np.arange(self.num_players)
+
+        self._inspiration = InspirationField(self.width, self.height, constants[0]['INSPIRATION_RADIUS'])
+
+    @staticmethod
+    def generate(width, height, num_players, seeds, **overrides):
+        """
+        Creates one game per seed on generated maps
+        :param width: The map width
+        :param height: The map height
+        :param num_players: The number of players, 1, 2 or 4
+        :param seeds: The map seeds
+        :param overrides: Game constants to replace
+        :return: The LockstepGames
+        """
+        constants = [game_constants(width, height, seed, **overrides) for seed in seeds]
+        maps = [generate_map(width, height, num_players, seed, game) for seed, game in zip(seeds, constants)]
+        return LockstepGames(constants, np.stack([halite for halite, _ in maps]),
+                             [shipyards for _, shipyards in maps])
+
+    @property
+    def is_over(self):
+        """
+        :return: Whether every turn has been played
+        """
+        return self.turn_number >= self.max_turns
+
+    @property
+    def ship_games(self):
+        """
+        :return: The game each ship is in
+        """
+        return self.ship_cells // self.area
+
+    def _seats(self, games, owners):
+        """
+        :return: Flat indices into the (games, players) arrays
+        """
+        return games * self.num_players + owners
+
+    def frames(self):
+        """
+        Builds every game's input for the next turn, once per turn however often it is called
+        :return: A list of hlt.frame.Frame, one per game
+        """
+        if self._frames is not None and self._frames[0] == self.turn_number:
+            return self._frames[1]
+
+        order = np.lexsort((self.ship_ids, self.ship_owners, self.ship_games))
+        cells = self.ship_cells[order]
+        local = cells % self.area
+        ships = np.stack([self.ship_owners[order], self.ship_ids[order], local % self.width, local // self.width,
+                          self.ship_cargo[order]], axis=1).reshape(-1, 5)
+        ship_splits = np.searchsorted(cells // self.area, np.arange(1, self.num_games))
+
+        dropoff_games = self.dropoff_cells // self.area
+        dropoff_order = np.lexsort((self.dropoff_ids, self.dropoff_owners, dropoff_games))
+        local = self.dropoff_cells[dropoff_order] % self.area
+        dropoffs = np.stack([self.dropoff_owners[dropoff_order], self.dropoff_ids[dropoff_order],
+                             local % self.width, local // self.width], axis=1).reshape(-1, 4)
+        dropoff_splits = np.searchsorted(dropoff_games[dropoff_order], np.arange(1, self.num_games))
+
+        changed = np.flatnonzero(self._halite != self._last_sent)
+        self._last_sent[changed] = self._halite[changed]
+        local = changed % self.area
+        cells = np.stack([local % self.width, local // self.width, self._halite[changed]], axis=1).reshape(-1, 3)
+        cell_splits = np.searchsorted(changed // self.area, np.arange(1, self.num_games))
+
+        ship_counts = np.bincount(self._seats(self.ship_games, self.ship_owners),
+                                  minlength=self.num_games * self.num_players)
+        dropoff_counts = np.bincount(self._seats(dropoff_games, self.dropoff_owners),
+                                     minlength=self.num_games * self.num_players)
+        players = np.stack([np.tile(np.arange(self.num_players), self.num_games), ship_counts, dropoff_counts,
+                            self.energy.reshape(-1)], axis=1).reshape(self.num_games, self.num_players, 4)
+
+        frames = [Frame(self.turn_number + 1, players[game], game_ships, game_dropoffs, game_cells)
+                  for game, (game_ships, game_dropoffs, game_cells) in enumerate(zip(
+                      np.split(ships, ship_splits), np.split(dropoffs, dropoff_splits), np.split(cells, cell_splits)))]
+        self._frames = (self.turn_number, frames)
+        return frames
+
+    def _remove_ships(self, keep):
+        """
+        Drops the ships where keep is False
+        """
+        self.ship_ids = self.ship_ids[keep]
+        self.ship_owners = self.ship_owners[keep]
+        self.ship_cells = self.ship_cells[keep]
+        self.ship_cargo = self.ship_cargo[keep]
+        self.ship_inspired = self.ship_inspired[keep]
+
+    def _location(self, cell):
+        """
+        :return: A replay location dict for a flat cell index
+        """
+        local = int(cell) % self.area
+        return {'x': local % self.width, 'y': local // self.width}
+
+    def step(self, orders, events=None):
+        """
+        Plays one turn of every game: dropoff construction, moves, spawns, collisions, inspiration, mining and
+        deposits, in the official engine's order.
+        :param orders: A list with one Orders per seat
+        :param events: A list per game to append replay event dicts for spawns, dropoff construction and
+            collisions to, or None to skip building them
+        """
+        constants = self.constants[0]
+        self.turn_number += 1
+        energy = self.energy.reshape(-1)
+
+        moves = np.full(len(self.ship_ids), rules.STILL, dtype=np.int64)
+        constructs = np.zeros(len(self.ship_ids), dtype=bool)
+        spawns = np.zeros((self.num_games, self.num_players), dtype=bool)
+        for player, seat in enumerate(orders):
+            own = self.ship_owners == player
+            moves[own] = seat.moves[own]
+            if seat.constructs is not None:
+                constructs |= own & seat.constructs
+            spawns[:, player] = seat.spawns
+
+        # Dropoff construction, which is rare enough to do ship by ship
+        converted = np.zeros(len(self.ship_ids), dtype=bool)
+        building = np.flatnonzero(constructs)
+        for i in building[np.lexsort((self.ship_ids[building], self.ship_owners[building],
+                                      self.ship_cells[building] // self.area))].tolist():
+            cell = self.ship_cells[i]
+            game = cell // self.area
+            seat = self._seats(game, self.ship_owners[i])
+            credit = self.ship_cargo[i] + self._halite[cell]
+            if self.structure_owner[cell] != -1 or energy[seat] + credit < constants['DROPOFF_COST']:
+                continue
+            energy[seat] += credit - constants['DROPOFF_COST']
+            self._halite[cell] = 0
+            self.structure_owner[cell] = self.ship_owners[i]
+            self.dropoff_ids = np.append(self.dropoff_ids, self._next_dropoff_id[game])
+            self.dropoff_owners = np.append(self.dropoff_owners, self.ship_owners[i])
+            self.dropoff_cells = np.append(self.dropoff_cells, cell)
+            if events is not None:
+                events[game].append({'type': 'construct', 'id': int(self._next_dropoff_id[game]),
+                                     'owner_id': int(self.ship_owners[i]), 'location': self._location(cell)})
+            self._next_dropoff_id[game] += 1
+            converted[i] = True
+
+        # Moves, paid for from cargo at the rate of the cell being left
+        costs = rules.move_costs(self._halite, self.ship_cells, self.ship_inspired, constants)
+        moving = (moves != rules.STILL) & (self.ship_cargo >= costs)
+        self.ship_cargo -= np.where(moving, costs, 0)
+        self.ship_cells = np.where(moving, rules.move_cells(self.ship_cells, moves, self.width, self.height),
+                                   self.ship_cells)
+        still = ~moving[~converted]
+        self._remove_ships(~converted)
+
+        # Spawns appear on the shipyard this turn, without mining
+        spawns &= self.energy >= constants['NEW_ENTITY_ENERGY_COST']
+        self.energy -= np.where(spawns, constants['NEW_ENTITY_ENERGY_COST'], 0)
+        games, owners = np.nonzero(spawns)
+        # Each game numbers its new ships in player order, as the engine does
+        spawned_ids = self._next_ship_id[games] + (np.cumsum(spawns, axis=1) - spawns)[games, owners]
+        self.ship_ids = np.concatenate([self.ship_ids, spawned_ids])
+        self.ship_owners = np.concatenate([self.ship_owners, owners])
+        self.ship_cells = np.concatenate([self.ship_cells, self.shipyard_cells[games, owners]])
+        self.ship_cargo = np.concatenate([self.ship_cargo, np.zeros(len(games), dtype=np.int64)])
+        self.ship_inspired = np.concatenate([self.ship_inspired, np.zeros(len(games), dtype=bool)])
+        still = np.concatenate([still, np.zeros(len(games), dtype=bool)])
+        self._next_ship_id += spawns.sum(axis=1)
+        if events is not None:
+            for game, owner, ship_id in zip(games.tolist(), owners.tolist(), spawned_ids.tolist()):
+                events[game].append({'type': 'spawn', 'id': ship_id, 'owner_id': owner, 'energy': 0,
+                                     'location': self._location(self.shipyard_cells[game, owner])})
+
+        # Collisions sink every ship involved. Their cargo goes to the owner of a structure on the cell, or
+        # into the sea
+        sunk = rules.collided(self.ship_cells)
+        if sunk.any():
+            if events is not None:
+                for cell in np.unique(self.ship_cells[sunk]).tolist():
+                    events[cell // self.area].append({'type': 'shipwreck',
+                                                      'ships': self.ship_ids[sunk & (self.ship_cells == cell)].tolist(),
+                                                      'location': self._location(cell)})
+            cells = self.ship_cells[sunk]
+            cargo = self.ship_cargo[sunk]
+            owners = self.structure_owner[cells]
+            owned = owners != -1
+            np.add.at(energy, self._seats(cells[owned] // self.area, owners[owned]), cargo[owned])
+            np.add.at(self._halite, cells[~owned], cargo[~owned])
+            self._remove_ships(~sunk)
+            still = still[~sunk]
+
+        # Inspiration at the ships' new positions
+        ship_owner = np.full(self.num_games * self.area, -1, dtype=np.int64)
+        ship_owner[self.ship_cells] = self.ship_owners
+        counts = self._inspiration.counts(ship_owner.reshape(self.num_games, self.height, self.width),
+                                          self.num_players)
+        self.ship_inspired = rules.inspired(counts.swapaxes(0, 1).reshape(self.num_players, -1), self.ship_owners,
+                                            self.ship_cells, constants)
+
+        # Mining by ships which stayed still
+        taken, gained = rules.extract(self._halite, self.ship_cells[still], self.ship_cargo[still],
+                                      self.ship_inspired[still], constants)
+        self._halite[self.ship_cells[still]] -= taken
+        self.ship_cargo[still] += gained
+
+        # Deposits on friendly structures
+        home = self.structure_owner[self.ship_cells] == self.ship_owners
+        seats = self._seats(self.ship_games[home], self.ship_owners[home])
+        np.add.at(energy, seats, self.ship_cargo[home])
+        np.add.at(self.deposited.reshape(-1), seats, self.ship_cargo[home])
+        self.ship_cargo[home] = 0
+
+        self.energy_history.append(self.energy.copy())
+
+    def ranks(self):
+        """
+        Ranks each game's players by halite, breaking ties by their halite on earlier turns, latest first
+        :return: A (games, players) array of ranks, 1 being best
+        """
+        history = self.energy_history or [self.energy]
+        order = np.lexsort([-energy for energy in history], axis=-1)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(1, self.num_players + 1)[np.newaxis], axis=1)
+        return ranks
+
+
+def _game_attribute(name):
+    """
+    :return: A property reading an attribute of a GameState's LockstepGames, which replaces its ship and dropoff
+        arrays as they change
+    """
+    return property(lambda self: getattr(self.games, name))
+
+
+class GameState:
+    """
+    Everything the engine knows about a game in progress.
+
+    The game is kept in a one-game LockstepGames, games; the arrays here are
+    views of that game's rows, and ship and dropoff cells are plain
+    y * width + x indices.
+    """
+    def __init__(self, constants, halite, shipyards):
+        """
+        :param constants: The game constants
+        :param halite: The (height, width) starting halite grid
+        :param shipyards: A list of (x, y) shipyard locations, one per player
+        """
+        self.games = LockstepGames([constants], np.asarray(halite)[np.newaxis], [shipyards])
+        self.constants = constants
+        self.height, self.width = self.games.height, self.games.width
+        self.num_players = self.games.num_players
+        self.shipyards = self.games.shipyards[0]
+        self.initial_halite = self.games.initial_halite[0]
+        self.halite = self.games.halite[0]
+        self.energy = self.games.energy[0]
+        self.deposited = self.games.deposited[0]
+        self.structure_owner = self.games.structure_owner
+        self.shipyard_cells = self.games.shipyard_cells[0]
+
+    @staticmethod
+    def generate(width, height, num_players, seed, **overrides):
+        """
+        Creates a new game on a generated map
+        :param width: The map width
+        :param height: The map height
+        :param num_players: The number of players, 1, 2 or 4
+        :param seed: The map seed
+        :param overrides: Game constants to replace
+        :return: The GameState
+        """
+        constants = game_constants(width, height, seed, **overrides)
+        halite, shipyards = generate_map(width, height, num_players, seed, constants)
+        return GameState(constants, halite, shipyards)
+
+    turn_number = _game_attribute('turn_number')
+    ship_ids = _game_attribute('ship_ids')
+    ship_owners = _game_attribute('ship_owners')
+    ship_cells = _game_attribute('ship_cells')
+    ship_cargo = _game_attribute('ship_cargo')
+    ship_inspired = _game_attribute('ship_inspired')
+    dropoff_ids = _game_attribute('dropoff_ids')
+    dropoff_owners = _game_attribute('dropoff_owners')
+    dropoff_cells = _game_attribute('dropoff_cells')
+
+    @property
+    def is_over(self):
+        """
+        :return: Whether every turn has been played
+        """
+        return self.games.is_over
+
+    @property
+    def energy_history(self):
+        """
+        :return: Each player's halite after every turn so far
+        """
+        return [energy[0] for energy in self.games.energy_history]
+
+    def frame(self):
+        """
+        Builds the input for the next turn and marks its changed cells as sent
+        :return: An hlt.frame.Frame
+        """
+        return self.games.frames()[0]
+
+    def step(self, commands):
+        """
+        Plays one turn.
+        :param commands: A list with one engine.protocol.Commands (or None for no commands) per player
+        :return: A list of replay event dicts for spawns, dropoff construction and collisions
+        """
+        index_of = {ship_id: i for i, ship_id in enumerate(self.ship_ids.tolist())}
+        orders = []
+        for command in commands:
+            moves = np.full(len(index_of), rules.STILL, dtype=np.int64)
+            constructs = np.zeros(len(index_of), dtype=bool)
+            if command is not None:
+                for ship_id, move in command.moves.items():
+                    if ship_id in index_of:
+                        moves[index_of[ship_id]] = move
+                constructs[[index_of[ship_id] for ship_id in command.constructs if ship_id in index_of]] = True
+            orders.append(Orders(moves, np.array([command is not None and command.spawn]), constructs))
+        events = [[]]
+        self.games.step(orders, events)
+        return events[0]
+
+    def ranks(self):
+        """
+        Ranks players by halite, breaking ties by their halite on earlier turns, latest first
+        :return: A list of ranks, 1 being best, indexed by player id
+        """
+        return self.games.ranks()[0].tolist()
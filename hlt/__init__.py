@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
-from . import commands, entity, game_map, networking, constants
+from . import commands, convolution, deadline, entity, frame, game_map, inspiration, navigation, networking, constants
+from . import logs, profiling, pull, recording, resolution, snapshot
 from .networking import Game
 from .positionals import Direction, Position
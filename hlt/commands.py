@@ -10,3 +10,18 @@ STAY_STILL = 'o'
 GENERATE = 'g'
 CONSTRUCT = 'c'
 MOVE = 'm'
+
+# Move characters indexed by direction code (North, South, East, West, Still)
+MOVE_CHARS = (NORTH, SOUTH, EAST, WEST, STAY_STILL)
+_MOVE_FORMATS = tuple(MOVE + " %d " + char for char in MOVE_CHARS)
+
+
+def serialize_moves(moves):
+    """
+    Formats many move commands in one pass
+    :param moves: (ship_id, direction) pairs, with Directions or direction codes; an (n, 2) integer array works too
+    :return: The move commands as one string, to add to the list of commands for Game.end_turn
+    """
+    if hasattr(moves, 'tolist'):
+        moves = moves.tolist()
+    return " ".join([_MOVE_FORMATS[direction] % ship_id for ship_id, direction in moves])
@@ -1,11 +1,61 @@
+import logging
+import select
+import sys
+
+from . import recording
+
+
 # Placed here to avoid circular imports
 def read_input():
     """
-    Reads input from stdin, shutting down logging and exiting if an EOFError occurs
+    Reads input from stdin, shutting down logging and exiting if an EOFError occurs.
+    The raw line is recorded when recording is on.
     :return: input read
     """
-    try:
-        return input()
-    except EOFError as eof:
-        logging.shutdown()
-        raise SystemExit(eof)
+    line = sys.stdin.buffer.readline()
+    if recording.recorder is not None:
+        recording.recorder.put(recording.INPUT, line)
+    if not line:
+        _end_of_input()
+    return line.decode().rstrip('\r\n')
+
+
+def wait_for_input():
+    """
+    Blocks until input from the engine is waiting to be read, without consuming any of it
+    """
+    sys.stdin.buffer.peek(1)
+
+
+def input_waiting(timeout):
+    """
+    Waits for new input from the engine without consuming any of it. Input already buffered by earlier reads is not
+    seen, so this is only reliable once everything the engine has sent so far has been read.
+    :param timeout: Seconds to wait
+    :return: Whether input arrived in time
+    """
+    return bool(select.select([sys.stdin], [], [], timeout)[0])
+
+
+def read_lines(count):
+    """
+    Reads several raw lines from stdin at once, shutting down logging and exiting if the input ends early.
+    The raw lines are recorded together when recording is on.
+    :param count: The number of lines to read
+    :return: A list of the lines read, as bytes
+    """
+    readline = sys.stdin.buffer.readline
+    lines = [readline() for _ in range(count)]
+    if recording.recorder is not None and count:
+        recording.recorder.put(recording.INPUT, b''.join(lines))
+    if count and not lines[-1]:
+        _end_of_input()
+    return lines
+
+
+def _end_of_input():
+    """
+    Shuts down logging, writing out any queued records, and exits once the engine closes our input
+    """
+    logging.shutdown()
+    raise SystemExit(EOFError())
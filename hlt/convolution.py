@@ -0,0 +1,53 @@
+"""
+Toroidal (wrap-around) correlation of whole map grids with fixed kernels.
+
+Kernels are described by their (dx, dy) offsets from the cell being
+evaluated, so that for a kernel k and a grid g the result at (x, y) is the
+sum of k(dx, dy) * g(x + dx, y + dy) with coordinates wrapped around the
+map. The work is done with real FFTs, so a whole grid costs the same
+regardless of kernel size.
+"""
+import numpy as np
+
+
+def wrapped_kernel(width, height, weights):
+    """
+    Places kernel weights on a map-sized grid, wrapping negative offsets around
+    :param width: The width of the map
+    :param height: The height of the map
+    :param weights: A dict of (dx, dy) offsets to weights
+    :return: A (height, width) float array
+    """
+    kernel = np.zeros((height, width))
+    for (dx, dy), weight in weights.items():
+        kernel[dy % height, dx % width] += weight
+    return kernel
+
+
+class ToroidalFilter:
+    """
+    One or more kernels, transformed once, which can be correlated with any number of grids.
+    """
+    def __init__(self, kernels):
+        """
+        :param kernels: A (height, width) kernel, or a stack of them with shape (k, height, width)
+        """
+        kernels = np.asarray(kernels, dtype=float)
+        self.shape = kernels.shape[-2:]
+        self._transform = np.conj(np.fft.rfft2(kernels))
+
+    def __call__(self, grids):
+        """
+        Correlates grids with the kernels
+        :param grids: A (height, width) grid, or any stack of them whose leading axes broadcast against the kernels'
+        :return: The correlated grids, as floats
+        """
+        return np.fft.irfft2(np.fft.rfft2(grids) * self._transform, s=self.shape)
+
+    def counts(self, grids):
+        """
+        Correlates integer grids with integer kernels, removing floating point error
+        :param grids: As for calling the filter
+        :return: The correlated grids, as int64
+        """
+        return np.rint(self(grids)).astype(np.int64)
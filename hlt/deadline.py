@@ -0,0 +1,211 @@
+"""
+Keeping each turn inside the engine's time limit.
+
+The TurnClock starts as the first byte of a turn's frame arrives, when the
+engine's own clock starts, not once the frame has been parsed. Phases of
+the turn take Budgets from it, shares of the time left before the
+deadline, and check budget.expired() between units of work so they can
+stop early with the best result they have so far.
+
+The Watchdog backs this up: if a turn's commands have not been sent by
+the deadline, it sends a fallback (by default no commands, so every ship
+stays still) from its own thread, and the bot's own commands for that turn
+are then dropped rather than sent late. The strategy thread may still be
+working on that turn when the next frame arrives, so the watchdog starts
+the next turn's clock itself: as the frame arrives if the bot had read
+everything sent so far, otherwise straight away, which is no later than
+the engine's clock can have started. That turn keeps back LATE_RESERVE
+more, since the late thread is still competing for the interpreter when
+the watchdog needs to wake up. Frames the bot reads after their turn has
+passed are still applied, but their commands are dropped.
+"""
+import threading
+import time
+
+# Seconds the engine allows per turn
+TURN_LIMIT = 2.0
+# Seconds kept back from the limit for sending commands and scheduling delays
+RESERVE = 0.25
+# Further seconds kept back on a turn whose frame arrived while the bot was still working on an earlier one
+LATE_RESERVE = 0.25
+# Seconds between the watchdog's checks for the next frame while the bot is late
+POLL_INTERVAL = 0.01
+
+
+class Budget:
+    """
+    A share of a turn's time.
+    """
+    def __init__(self, deadline):
+        """
+        :param deadline: The time.perf_counter() value at which the budget runs out
+        """
+        self.deadline = deadline
+
+    def remaining(self):
+        """
+        :return: Seconds left, never negative
+        """
+        return max(self.deadline - time.perf_counter(), 0.0)
+
+    def expired(self):
+        """
+        :return: Whether the budget has run out
+        """
+        return time.perf_counter() >= self.deadline
+
+
+class TurnClock:
+    """
+    Times each turn and decides whether the bot or the watchdog sends its commands.
+    """
+    def __init__(self, limit=TURN_LIMIT, reserve=RESERVE, late_reserve=LATE_RESERVE):
+        """
+        :param limit: Seconds allowed per turn
+        :param reserve: Seconds before the limit at which the turn is considered over
+        :param late_reserve: Further seconds kept back on turns which arrive while an earlier one is still running
+        """
+        self.limit = limit
+        self.reserve = reserve
+        self.late_reserve = late_reserve
+        # Turns whose frames have arrived, the latest being the current turn, and frames the bot has read
+        self.turn = 0
+        self.frames_read = 0
+        self._started = time.perf_counter()
+        self._late = False
+        self._claimed = True
+        self._condition = threading.Condition()
+
+    def arrived(self, after=None, late=False):
+        """
+        Starts timing a new turn as the first byte of its frame arrives
+        :param after: The turn the caller saw end, when the caller is not the thread reading frames. The new turn
+            only starts if that is still the current turn, so it is not started twice. Without it, the turn only
+            starts if the next frame to read has not arrived already.
+        :param late: Whether the bot is still working on an earlier turn, which keeps back late_reserve more
+        """
+        with self._condition:
+            if self.turn != (self.frames_read if after is None else after):
+                return
+            self._started = time.perf_counter()
+            self._late = late
+            self.turn += 1
+            self._claimed = False
+            self._condition.notify_all()
+
+    def start(self):
+        """
+        Marks the next frame as read, starting its turn now if its arrival was not timed
+        :return: The frame's turn number, to claim its commands with. It is behind the current turn if the bot has
+            fallen behind, and the claim then fails.
+        """
+        with self._condition:
+            self.arrived()
+            self.frames_read += 1
+            return self.frames_read
+
+    @property
+    def deadline(self):
+        """
+        :return: The time.perf_counter() value by which this turn's commands should be sent
+        """
+        return self._started + self.limit - self.reserve - (self.late_reserve if self._late else 0.0)
+
+    def elapsed(self):
+        """
+        :return: Seconds since the turn started
+        """
+        return time.perf_counter() - self._started
+
+    def remaining(self):
+        """
+        :return: Seconds left before the deadline, never negative
+        """
+        return max(self.deadline - time.perf_counter(), 0.0)
+
+    def expired(self):
+        """
+        :return: Whether the deadline has passed
+        """
+        return time.perf_counter() >= self.deadline
+
+    def budget(self, share=1.0):
+        """
+        :param share: The fraction of the time left before the deadline to hand out
+        :return: A Budget
+        """
+        now = time.perf_counter()
+        return Budget(now + max(self.deadline - now, 0.0) * share)
+
+    def claim(self, turn=None):
+        """
+        Takes the right to send this turn's commands. Only the first claim of a turn succeeds.
+        :param turn: The turn being claimed for, or None for the current turn
+        :return: Whether the caller should send its commands
+        """
+        with self._condition:
+            if self._claimed or (turn is not None and turn != self.turn):
+                return False
+            self._claimed = True
+            self._condition.notify_all()
+            return True
+
+    def wait_for_deadline(self):
+        """
+        Blocks until a turn either reaches its deadline unclaimed or is claimed
+        :return: The turn which reached its deadline, or None if it was claimed in time
+        """
+        with self._condition:
+            while self._claimed:
+                self._condition.wait()
+            turn = self.turn
+            while not self._claimed and turn == self.turn:
+                timeout = self.deadline - time.perf_counter()
+                if timeout <= 0:
+                    return turn
+                self._condition.wait(timeout)
+            return None
+
+
+class Watchdog(threading.Thread):
+    """
+    Sends fallback commands for any turn which reaches its deadline unclaimed.
+    """
+    def __init__(self, clock, send, fallback=None, input_waiting=None):
+        """
+        :param clock: The TurnClock to watch
+        :param send: Called with the fallback command list
+        :param fallback: Called with no arguments to build the fallback command list, [] if None
+        :param input_waiting: Called with a timeout in seconds, returning whether new input arrived in that time, so
+            turns are timed while the bot is still busy with an earlier one; None to leave that to the bot
+        """
+        super().__init__(name='turn-watchdog', daemon=True)
+        self.clock = clock
+        self.send = send
+        self.fallback = fallback
+        self.input_waiting = input_waiting
+        self.fallbacks_sent = 0
+
+    def run(self):
+        while True:
+            turn = self.clock.wait_for_deadline()
+            if turn is not None and self.clock.claim(turn):
+                self.send(self.fallback() if self.fallback is not None else [])
+                self.fallbacks_sent += 1
+                if self.input_waiting is not None:
+                    self._time_next_frame(turn)
+
+    def _time_next_frame(self, turn):
+        """
+        Starts the turn after one which fell back, unless the bot gets to it first
+        :param turn: The turn which fell back
+        """
+        clock = self.clock
+        if clock.frames_read < turn:
+            # The bot has not read this turn's frame, so it is still waiting and would hide the next one
+            clock.arrived(after=turn, late=True)
+            return
+        while clock.turn == turn:
+            if self.input_waiting(POLL_INTERVAL):
+                clock.arrived(after=turn, late=True)
+                return
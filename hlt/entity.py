@@ -1,14 +1,14 @@
-import abc
-
 from . import commands, constants
 from .positionals import Direction, Position
 from .common import read_input
 
 
-class Entity(abc.ABC):
+class Entity:
     """
     Base Entity Class from whence Ships, Dropoffs and Shipyards inherit
     """
+    __slots__ = ('owner', 'id', 'position')
+
     def __init__(self, owner, id, position):
         self.owner = owner
         self.id = id
@@ -34,13 +34,15 @@ class Dropoff(Entity):
     """
     Dropoff class for housing dropoffs
     """
-    pass
+    __slots__ = ()
 
 
 class Shipyard(Entity):
     """
     Shipyard class to house shipyards
     """
+    __slots__ = ()
+
     def spawn(self):
         """Return a move to spawn a new ship."""
         return commands.GENERATE
@@ -50,6 +52,8 @@ class Ship(Entity):
     """
     Ship class to house ship entities
     """
+    __slots__ = ('halite_amount',)
+
     def __init__(self, owner, id, position, halite_amount):
         super().__init__(owner, id, position)
         self.halite_amount = halite_amount
@@ -68,8 +72,11 @@ class Ship(Entity):
         Return a move to move this ship in a direction without
         checking for collisions.
         """
-        raw_direction = direction
-        if not isinstance(direction, str) or direction not in "nsewo":
+        if direction.__class__ is Direction:
+            raw_direction = direction.command
+        elif isinstance(direction, str) and direction in "nsewo":
+            raw_direction = direction
+        else:
             raw_direction = Direction.convert(direction)
         return "{} {} {}".format(commands.MOVE, self.id, raw_direction)
 
@@ -0,0 +1,78 @@
+"""
+Bulk parsing of the engine's per-turn input.
+
+Rather than splitting and converting one line at a time, each section of a
+turn (ships, dropoffs, changed cells) is read as a block of raw lines and
+converted to integers in a single NumPy call.
+"""
+import numpy as np
+
+from .common import read_input, read_lines
+
+
+class Frame:
+    """
+    A single turn of engine input as packed integer arrays.
+
+    * players: rows of (player_id, num_ships, num_dropoffs, halite)
+    * ships: rows of (owner, ship_id, x, y, halite), grouped by player in the order of `players`
+    * dropoffs: rows of (owner, dropoff_id, x, y), grouped by player in the order of `players`
+    * cells: rows of (x, y, halite) for each cell which changed since the previous turn
+    """
+    __slots__ = ('turn_number', 'players', 'ships', 'dropoffs', 'cells')
+
+    def __init__(self, turn_number, players, ships, dropoffs, cells):
+        self.turn_number = turn_number
+        self.players = players
+        self.ships = ships
+        self.dropoffs = dropoffs
+        self.cells = cells
+
+    def __repr__(self):
+        return "{}(turn={}, ships={}, dropoffs={}, cells={})".format(self.__class__.__name__,
+                                                                     self.turn_number,
+                                                                     len(self.ships),
+                                                                     len(self.dropoffs),
+                                                                     len(self.cells))
+
+
+def parse_rows(lines, columns):
+    """
+    Converts raw lines of whitespace separated integers into a 2D array
+    :param lines: A list of lines, as bytes
+    :param columns: The number of integers on each line
+    :return: An int64 array of shape (len(lines), columns)
+    """
+    if not lines:
+        return np.empty((0, columns), dtype=np.int64)
+    return np.fromstring(b' '.join(lines), dtype=np.int64, sep=' ').reshape(-1, columns)
+
+
+def read_frame(num_players):
+    """
+    Reads a whole turn of input from the game engine
+    :param num_players: The number of players in the game
+    :return: The Frame read
+    """
+    turn_number = int(read_input())
+
+    players = np.empty((num_players, 4), dtype=np.int64)
+    ship_lines = []
+    dropoff_lines = []
+    for i in range(num_players):
+        player, num_ships, num_dropoffs, halite = map(int, read_input().split())
+        players[i] = player, num_ships, num_dropoffs, halite
+        ship_lines += read_lines(num_ships)
+        dropoff_lines += read_lines(num_dropoffs)
+
+    cells = parse_rows(read_lines(int(read_input())), 3)
+
+    ships = np.empty((len(ship_lines), 5), dtype=np.int64)
+    ships[:, 0] = np.repeat(players[:, 0], players[:, 1])
+    ships[:, 1:] = parse_rows(ship_lines, 4)
+
+    dropoffs = np.empty((len(dropoff_lines), 4), dtype=np.int64)
+    dropoffs[:, 0] = np.repeat(players[:, 0], players[:, 2])
+    dropoffs[:, 1:] = parse_rows(dropoff_lines, 3)
+
+    return Frame(turn_number, players, ships, dropoffs, cells)
@@ -1,15 +1,50 @@
 import queue
 import logging
 
+import numpy as np
+
 from . import constants
 from .entity import Entity, Shipyard, Ship, Dropoff
-from .positionals import Direction, Position
-from .common import read_input
+from .positionals import Direction, MapPosition, Position, PositionTable
+from .common import read_input, read_lines
+from .frame import parse_rows
+from .snapshot import MapSnapshot
+
+# Directions indexed by the move codes of GameMap's first-step tables.
+# Still doubles as "no move needed along this axis".
+MOVES = Direction.get_all_cardinals() + [Direction.Still]
+NO_MOVE = len(MOVES) - 1
+
+
+def _axis_tables(size, forward, backward):
+    """
+    Precomputes wrapped distances and first-step moves along one axis of the map
+    :param size: The length of the axis
+    :param forward: The move code for increasing coordinates (South or East)
+    :param backward: The move code for decreasing coordinates (North or West)
+    :return: Two size x size lists of lists, indexed [source][target]: the wrapped distance and the move code
+    """
+    distances = [[0] * size for _ in range(size)]
+    moves = [[NO_MOVE] * size for _ in range(size)]
+    for source in range(size):
+        for target in range(size):
+            offset = abs(target - source)
+            distances[source][target] = min(offset, size - offset)
+            if offset != 0:
+                toward = forward if target > source else backward
+                away = backward if target > source else forward
+                moves[source][target] = toward if offset < size / 2 else away
+    return distances, moves
 
 
 class Player:
     """
     Player object containing all items/metadata pertinent to the player.
+
+    Ships and dropoffs are kept by id and updated in place each turn, so the
+    same objects last for their whole lives. After each update, spawned,
+    destroyed and converted list the ids of ships which appeared, sank, or
+    became dropoffs since the previous turn.
     """
     def __init__(self, player_id, shipyard, halite=0):
         self.id = player_id
@@ -17,6 +52,9 @@ class Player:
         self.halite_amount = halite
         self._ships = {}
         self._dropoffs = {}
+        self.spawned = []
+        self.destroyed = []
+        self.converted = []
 
     def get_ship(self, ship_id):
         """
@@ -67,28 +105,107 @@ class Player:
         player, shipyard_x, shipyard_y = map(int, read_input().split())
         return Player(player, Shipyard(player, -1, Position(shipyard_x, shipyard_y)))
 
-    def _update(self, num_ships, num_dropoffs, halite):
+    def _update(self, halite, ships, dropoffs, positions=None):
         """
         Updates this player object considering the input from the game engine for the current specific turn.
-        :param num_ships: The number of ships this player has this turn
-        :param num_dropoffs: The number of dropoffs this player has this turn
         :param halite: How much halite the player has in total
+        :param ships: Rows of (owner, ship_id, x, y, halite) for this player's ships this turn
+        :param dropoffs: Rows of (owner, dropoff_id, x, y) for this player's dropoffs this turn
+        :param positions: The map's PositionTable, to give entities interned positions
         :return: nothing.
         """
+        position_at = Position if positions is None else positions.at
         self.halite_amount = halite
-        self._ships = {id: ship for (id, ship) in [Ship._generate(self.id) for _ in range(num_ships)]}
-        self._dropoffs = {id: dropoff for (id, dropoff) in [Dropoff._generate(self.id) for _ in range(num_dropoffs)]}
+        previous = self._ships
+        self._ships = {}
+        self.spawned = []
+        for _, ship_id, x, y, ship_halite in ships.tolist():
+            ship = previous.pop(ship_id, None)
+            if ship is None:
+                ship = Ship(self.id, ship_id, position_at(x, y), ship_halite)
+                self.spawned.append(ship_id)
+            else:
+                if ship.position.x != x or ship.position.y != y:
+                    ship.position = position_at(x, y)
+                ship.halite_amount = ship_halite
+            self._ships[ship_id] = ship
+
+        built = set()
+        for _, dropoff_id, x, y in dropoffs.tolist():
+            if dropoff_id not in self._dropoffs:
+                dropoff = self._dropoffs[dropoff_id] = Dropoff(self.id, dropoff_id, position_at(x, y))
+                built.add(dropoff.position)
+
+        # Ships that are gone either sank or became one of this turn's new dropoffs
+        self.converted = [ship.id for ship in previous.values() if ship.position in built]
+        self.destroyed = [ship.id for ship in previous.values() if ship.position not in built]
 
 
 class MapCell:
-    """A cell on the game map."""
-    def __init__(self, position, halite_amount):
+    """
+    A cell on the game map.
+
+    Cells hold no state of their own: every field is a view onto the
+    arrays owned by the GameMap, so writes through a cell are visible to
+    array-level code and vice versa. A cell built on its own, as
+    MapCell(position, halite_amount), is backed by a one-cell map until
+    it is handed to a GameMap, which then takes it over.
+    """
+    __slots__ = ('_map', '_index', 'position')
+
+    def __init__(self, position, halite_amount=0, game_map=None):
+        """
+        :param position: The cell's position
+        :param halite_amount: The halite in a cell built on its own; a cell of a map reads it from the map
+        :param game_map: The map the cell is a view onto, or None for a cell on its own
+        """
+        if game_map is None:
+            game_map = GameMap([halite_amount], 1, 1)
+            self._index = 0
+        else:
+            self._index = position.y * game_map.width + position.x
+        self._map = game_map
         self.position = position
-        self.halite_amount = halite_amount
-        self.ship = None
-        self.structure = None
-        self.safe = True
-        self.inspired = False
+
+    @property
+    def halite_amount(self):
+        return self._map._halite.item(self._index)
+
+    @halite_amount.setter
+    def halite_amount(self, amount):
+        self._map._set_halite(self._index, amount)
+
+    @property
+    def ship(self):
+        return self._map._ships.get(self._index)
+
+    @ship.setter
+    def ship(self, ship):
+        self._map._set_ship(self._index, ship)
+
+    @property
+    def structure(self):
+        return self._map._structures.get(self._index)
+
+    @structure.setter
+    def structure(self, structure):
+        self._map._set_structure(self._index, structure)
+
+    @property
+    def safe(self):
+        return self._map._safe.item(self._index)
+
+    @safe.setter
+    def safe(self, safe):
+        self._map._set_safe(self._index, safe)
+
+    @property
+    def inspired(self):
+        return self._map._inspired.item(self._index)
+
+    @inspired.setter
+    def inspired(self, inspired):
+        self._map._set_inspired(self._index, inspired)
 
     @property
     def is_empty(self):
@@ -158,11 +275,113 @@ class GameMap:
 
     Can be indexed by a position, or by a contained entity.
     Coordinates start at 0. Coordinates are normalized for you
+
+    The board is stored as contiguous (height, width) NumPy arrays which
+    strategy code may read directly but must treat as read-only:
+
+    * halite: halite in each cell
+    * ship_owner: id of the player whose ship is in each cell, -1 if none
+    * structure_owner: id of the player owning the shipyard or dropoff
+      in each cell, -1 if none
+    * safe: whether each cell is safe for navigation
+    * inspired: whether each cell is inspiring
+
+    Indexing the map returns a MapCell view over these arrays. It accepts
+    any Position, but the interned MapPositions in positions, which the
+    map hands out for cells, ships and dropoffs, carry their flat index
+    and neighbours and skip the wrapping arithmetic.
+
+    Each turn only the cells which changed are touched. The flat indices
+    (y * width + x) involved are kept for strategy code to query:
+
+    * changed_cells: cells whose halite the engine reported as changed this turn
+    * unsafe_cells: cells marked unsafe this turn
+    * inspired_cells: cells marked inspiring this turn
+
+    Every change goes through MapCell, or mark_unsafe/mark_inspired for
+    many cells at once, never through the arrays: the map tracks what it
+    changes, so marks are cleared at the start of the next turn and
+    total_halite and the summed-area table stay correct.
+
+    total_halite is kept up to date from each turn's changed cells. Sums
+    over rectangles, quadrants and squares wrap around the map and come from
+    a summed-area table over two copies of the map in each direction,
+    rebuilt at most once per turn when first queried after halite changed.
     """
-    def __init__(self, cells, width, height):
+    def __init__(self, halite, width, height):
+        """
+        :param halite: The halite in each cell, as rows or as a flat sequence. Rows of MapCells, as older code
+            passed, are also accepted: the map takes over their contents, and the cells become views onto it.
+        :param width: The width of the map
+        :param height: The height of the map
+        """
+        cells = None
+        if height and width and isinstance(halite[0], (list, tuple)) and isinstance(halite[0][0], MapCell):
+            cells = halite
+            halite = [[cell.halite_amount for cell in row] for row in cells]
         self.width = width
         self.height = height
-        self._cells = cells
+
+        self.halite = np.array(halite, dtype=np.int32).reshape(height, width)
+        self.ship_owner = np.full((height, width), -1, dtype=np.int16)
+        self.structure_owner = np.full((height, width), -1, dtype=np.int16)
+        self.safe = np.ones((height, width), dtype=bool)
+        self.inspired = np.zeros((height, width), dtype=bool)
+
+        # Flat views sharing memory with the arrays above, indexed by
+        # y * width + x
+        self._halite = self.halite.reshape(-1)
+        self._ship_owner = self.ship_owner.reshape(-1)
+        self._structure_owner = self.structure_owner.reshape(-1)
+        self._safe = self.safe.reshape(-1)
+        self._inspired = self.inspired.reshape(-1)
+
+        self._ships = {}
+        self._structures = {}
+        self.changed_cells = np.empty(0, dtype=np.int64)
+        self.unsafe_cells = set()
+        self.inspired_cells = set()
+        self._dropoff_fields = {}
+        self._dropoff_fields_checked = set()
+        self.total_halite = int(self._halite.sum())
+        self._summed_area = None
+        self.positions = PositionTable.for_size(width, height)
+        self._cells = [MapCell(position, game_map=self) for position in self.positions.positions]
+        if cells is not None:
+            self._adopt(cells)
+
+        # Wrapped distances and first-step move codes, per axis, indexed
+        # [source][target]. Lists serve scalar lookups, arrays vectorized ones.
+        self._x_distance, self._x_move = _axis_tables(width, MOVES.index(Direction.East),
+                                                      MOVES.index(Direction.West))
+        self._y_distance, self._y_move = _axis_tables(height, MOVES.index(Direction.South),
+                                                      MOVES.index(Direction.North))
+        self._x_distance_array = np.array(self._x_distance, dtype=np.int32)
+        self._y_distance_array = np.array(self._y_distance, dtype=np.int32)
+        self._x_move_array = np.array(self._x_move, dtype=np.int8)
+        self._y_move_array = np.array(self._y_move, dtype=np.int8)
+        # The list of unsafe moves for each (x move, y move) pair
+        self._moves = [[[MOVES[code] for code in (x_code, y_code) if code != NO_MOVE]
+                        for y_code in range(len(MOVES))] for x_code in range(len(MOVES))]
+
+    def _adopt(self, cells):
+        """
+        Takes over rows of cells built on their own, copying their contents into the map and turning each cell into
+        a view onto it, so code holding the cells sees the map
+        :param cells: Rows of MapCells, one per cell of the map
+        """
+        for y, row in enumerate(cells):
+            for x, cell in enumerate(row):
+                index = y * self.width + x
+                ship, structure, safe, inspired = cell.ship, cell.structure, cell.safe, cell.inspired
+                cell._map = self
+                cell._index = index
+                cell.position = self.positions.positions[index]
+                self._cells[index] = cell
+                cell.ship = ship
+                cell.structure = structure
+                cell.safe = safe
+                cell.inspired = inspired
 
     def __getitem__(self, location):
         """
@@ -170,12 +389,131 @@ class GameMap:
         :param location: the position or entity to access in this map
         :return: the contents housing that cell or entity
         """
-        if isinstance(location, Position):
-            location = self.normalize(location)
-            return self._cells[location.y][location.x]
-        elif isinstance(location, Entity):
-            return self._cells[location.position.y][location.position.x]
-        return None
+        if isinstance(location, Entity):
+            location = location.position
+        elif not isinstance(location, Position):
+            return None
+        if location.__class__ is MapPosition and location.table is self.positions:
+            return self._cells[location.index]
+        return self._cells[(location.y % self.height) * self.width + location.x % self.width]
+
+    def _set_halite(self, index, amount):
+        """
+        Sets the halite in the cell at a flat index, keeping the total and region sums correct
+        """
+        self.total_halite += amount - self._halite.item(index)
+        self._halite[index] = amount
+        self._summed_area = None
+
+    def _set_ship(self, index, ship):
+        """
+        Places a ship in (or with None, removes any ship from) the cell at a flat index
+        """
+        if ship is None:
+            self._ships.pop(index, None)
+            self._ship_owner[index] = -1
+        else:
+            self._ships[index] = ship
+            self._ship_owner[index] = ship.owner
+
+    def _set_structure(self, index, structure):
+        """
+        Places a structure in (or with None, removes any structure from) the cell at a flat index
+        """
+        if structure is None:
+            self._structures.pop(index, None)
+            self._structure_owner[index] = -1
+        else:
+            self._structures[index] = structure
+            self._structure_owner[index] = structure.owner
+
+    def _set_safe(self, index, safe):
+        """
+        Marks the cell at a flat index as safe or unsafe, remembering unsafe cells for the next reset
+        """
+        self._safe[index] = safe
+        if safe:
+            self.unsafe_cells.discard(index)
+        else:
+            self.unsafe_cells.add(index)
+
+    def _set_inspired(self, index, inspired):
+        """
+        Marks the cell at a flat index as inspiring or not, remembering inspiring cells for the next reset
+        """
+        self._inspired[index] = inspired
+        if inspired:
+            self.inspired_cells.add(index)
+        else:
+            self.inspired_cells.discard(index)
+
+    def mark_unsafe(self, indices):
+        """
+        Mark many cells as unsafe for navigation at once
+        :param indices: An iterable of flat cell indices
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        self._safe[indices] = False
+        self.unsafe_cells.update(indices.tolist())
+
+    def mark_inspired(self, indices):
+        """
+        Mark many cells as inspiring at once
+        :param indices: An iterable of flat cell indices
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        self._inspired[indices] = True
+        self.inspired_cells.update(indices.tolist())
+
+    def get_rectangle_halite(self, corner, width, height):
+        """
+        Sums the halite in a rectangle, wrapping around the map. Works on arrays of corners too.
+        :param corner: The position of the rectangle's top left (least x and y) cell, or a pair of x and y arrays
+        :param width: The width of the rectangle, at most the map width
+        :param height: The height of the rectangle, at most the map height
+        :return: The total halite in the rectangle
+        """
+        if self._summed_area is None:
+            tiled = np.tile(self.halite.astype(np.int64), (2, 2))
+            self._summed_area = np.zeros((2 * self.height + 1, 2 * self.width + 1), dtype=np.int64)
+            self._summed_area[1:, 1:] = tiled.cumsum(axis=0).cumsum(axis=1)
+        x, y = (corner.x, corner.y) if isinstance(corner, Position) else corner
+        left = np.mod(x, self.width)
+        top = np.mod(y, self.height)
+        right = left + width
+        bottom = top + height
+        table = self._summed_area
+        return table[bottom, right] - table[top, right] - table[bottom, left] + table[top, left]
+
+    def get_square_halite(self, center, radius):
+        """
+        :param center: The position at the middle of the square, or a pair of x and y arrays
+        :param radius: How far the square reaches from its center in each direction, along both axes
+        :return: The total halite within radius moves along each axis of the center, each cell counted once
+        """
+        x, y = (center.x, center.y) if isinstance(center, Position) else center
+        width = min(2 * radius + 1, self.width)
+        height = min(2 * radius + 1, self.height)
+        return self.get_rectangle_halite((np.subtract(x, width // 2), np.subtract(y, height // 2)), width, height)
+
+    def get_quadrant_halite(self, location=None):
+        """
+        Splits the map into four blocks of half its width and height which meet at a location
+        :param location: Where the blocks meet, the map's origin by default
+        :return: A 2x2 array of the halite in the blocks north west and north east, then south west and south east
+        """
+        x, y = (0, 0) if location is None else (location.x, location.y)
+        half_width, half_height = self.width // 2, self.height // 2
+        xs = np.array([x - half_width, x])
+        ys = np.array([y - half_height, y])[:, np.newaxis]
+        return self.get_rectangle_halite((xs, ys), half_width, half_height)
+
+    def snapshot(self):
+        """
+        :return: A MapSnapshot of the halite and structures, which can be changed and forked without copying the
+            map. It reads the map as it is, so it is only valid until the next turn's update.
+        """
+        return MapSnapshot(self)
 
     def calculate_distance(self, source, target):
         """
@@ -185,11 +523,77 @@ class GameMap:
         :param target: The target to where calculate
         :return: The distance between these items
         """
-        source = self.normalize(source)
-        target = self.normalize(target)
-        resulting_position = abs(source - target)
-        return min(resulting_position.x, self.width - resulting_position.x) + \
-            min(resulting_position.y, self.height - resulting_position.y)
+        return self._x_distance[source.x % self.width][target.x % self.width] + \
+            self._y_distance[source.y % self.height][target.y % self.height]
+
+    def calculate_distances(self, sources, targets):
+        """
+        Compute the wrapped Manhattan distances between many pairs of cells at once.
+        :param sources: An array of flat cell indices
+        :param targets: An array of flat cell indices, broadcastable against sources
+        :return: An array of distances
+        """
+        sources = np.asarray(sources)
+        targets = np.asarray(targets)
+        return self._x_distance_array[sources % self.width, targets % self.width] + \
+            self._y_distance_array[sources // self.width, targets // self.width]
+
+    def index(self, location):
+        """
+        :param location: A position or entity
+        :return: The flat index (y * width + x) of its cell
+        """
+        position = location.position if isinstance(location, Entity) else location
+        if position.__class__ is MapPosition and position.table is self.positions:
+            return position.index
+        return (position.y % self.height) * self.width + position.x % self.width
+
+    def _dropoff_field(self, player):
+        """
+        Returns the nearest-dropoff field for a player, recomputing it only if their structures changed.
+        Structures are checked at most once per turn.
+        :param player: The player
+        :return: A tuple of (structure cell indices, structures, distance grid, distances list, nearest list)
+        """
+        field = self._dropoff_fields.get(player.id)
+        if player.id in self._dropoff_fields_checked:
+            return field
+
+        self._dropoff_fields_checked.add(player.id)
+        structures = player.get_dropoffs() + [player.shipyard]
+        key = tuple(self.index(structure) for structure in structures)
+        if field is None or field[0] != key:
+            distances = self.calculate_distances(np.arange(self.width * self.height)[:, np.newaxis], np.array(key))
+            nearest = distances.argmin(axis=1)
+            least = distances.min(axis=1)
+            field = (key, structures, least.reshape(self.height, self.width), least.tolist(), nearest.tolist())
+            self._dropoff_fields[player.id] = field
+        return field
+
+    def get_closest_dropoff(self, player, location):
+        """
+        Finds the player's dropoff or shipyard closest to a location. Ties go to dropoffs over the shipyard.
+        :param player: The player whose structures to consider
+        :param location: A position or entity
+        :return: The closest Dropoff or Shipyard
+        """
+        _, structures, _, _, nearest = self._dropoff_field(player)
+        return structures[nearest[self.index(location)]]
+
+    def calculate_dropoff_distance(self, player, location):
+        """
+        :param player: The player whose structures to consider
+        :param location: A position or entity
+        :return: The distance from the location to the player's closest dropoff or shipyard
+        """
+        return self._dropoff_field(player)[3][self.index(location)]
+
+    def get_dropoff_distances(self, player):
+        """
+        :param player: The player whose structures to consider
+        :return: A (height, width) array of the distance from each cell to the player's closest dropoff or shipyard
+        """
+        return self._dropoff_field(player)[2]
 
     def normalize(self, position):
         """
@@ -198,21 +602,9 @@ class GameMap:
         height bounds, and places it within those bounds considering
         wraparound.
         :param position: A position object.
-        :return: A normalized position object fitting within the bounds of the map
-        """
-        return Position(position.x % self.width, position.y % self.height)
-
-    @staticmethod
-    def _get_target_direction(source, target):
-        """
-        Returns where in the cardinality spectrum the target is from source. e.g.: North, East; South, West; etc.
-        NOTE: Ignores toroid
-        :param source: The source position
-        :param target: The target position
-        :return: A tuple containing the target Direction. A tuple item (or both) could be None if within same coords
+        :return: The interned MapPosition fitting within the bounds of the map
         """
-        return (Direction.South if target.y > source.y else Direction.North if target.y < source.y else None,
-                Direction.East if target.x > source.x else Direction.West if target.x < source.x else None)
+        return self.positions.at(position.x, position.y)
 
     def get_safe_adjacent(self, source):
         """
@@ -233,21 +625,23 @@ class GameMap:
         are viable.
         :param source: The starting position
         :param destination: The destination towards which you wish to move your object.
-        :return: A list of valid (closest) Directions towards your target.
-        """
-        source = self.normalize(source)
-        destination = self.normalize(destination)
-        possible_moves = []
-        distance = abs(destination - source)
-        y_cardinality, x_cardinality = self._get_target_direction(source, destination)
-
-        if distance.x != 0:
-            possible_moves.append(x_cardinality if distance.x < (self.width / 2)
-                                  else Direction.invert(x_cardinality))
-        if distance.y != 0:
-            possible_moves.append(y_cardinality if distance.y < (self.height / 2)
-                                  else Direction.invert(y_cardinality))
-        return possible_moves
+        :return: A list of valid (closest) Directions towards your target. The list is shared; do not modify it.
+        """
+        return self._moves[self._x_move[source.x % self.width][destination.x % self.width]][
+            self._y_move[source.y % self.height][destination.y % self.height]]
+
+    def get_unsafe_move_codes(self, sources, destinations):
+        """
+        Vectorized get_unsafe_moves for many pairs of cells at once.
+        :param sources: An array of flat cell indices
+        :param destinations: An array of flat cell indices, broadcastable against sources
+        :return: Two arrays of move codes (indices into MOVES), for the x and y axis. NO_MOVE marks an axis
+        on which the points already agree.
+        """
+        sources = np.asarray(sources)
+        destinations = np.asarray(destinations)
+        return (self._x_move_array[sources % self.width, destinations % self.width],
+                self._y_move_array[sources // self.width, destinations // self.width])
 
     def naive_navigate(self, ship, destination):
         """
@@ -274,27 +668,41 @@ class GameMap:
         :return: The map object
         """
         map_width, map_height = map(int, read_input().split())
-        game_map = [[None for _ in range(map_width)] for _ in range(map_height)]
-        for y_position in range(map_height):
-            cells = read_input().split()
-            for x_position in range(map_width):
-                game_map[y_position][x_position] = MapCell(Position(x_position, y_position),
-                                                           int(cells[x_position]))
-        return GameMap(game_map, map_width, map_height)
+        halite = parse_rows(read_lines(map_height), map_width)
+        return GameMap(halite, map_width, map_height)
 
-    def _update(self):
+    def _update(self, cells):
         """
         Updates this map object from the input given by the game engine
+        :param cells: Rows of (x, y, halite) for each cell which changed this turn
+        :return: nothing
+        """
+        self._dropoff_fields_checked.clear()
+
+        # Only the cells marked last turn need resetting
+        if self._ships:
+            self._ship_owner[list(self._ships)] = -1
+            self._ships.clear()
+        if self.unsafe_cells:
+            self._safe[list(self.unsafe_cells)] = True
+            self.unsafe_cells.clear()
+        if self.inspired_cells:
+            self._inspired[list(self.inspired_cells)] = False
+            self.inspired_cells.clear()
+
+        self.changed_cells = cells[:, 1] * self.width + cells[:, 0]
+        if len(self.changed_cells):
+            self.total_halite += int(cells[:, 2].sum()) - int(self._halite[self.changed_cells].sum())
+            self._halite[self.changed_cells] = cells[:, 2]
+            self._summed_area = None
+
+    def _place_ships(self, indices, owners, ships):
+        """
+        Places this turn's ships on the map
+        :param indices: The flat cell index of each ship
+        :param owners: The owner of each ship
+        :param ships: The ship objects, in the same order
         :return: nothing
         """
-        # Mark cells as safe for navigation (will re-mark unsafe cells
-        # later)
-        for y in range(self.height):
-            for x in range(self.width):
-                self[Position(x, y)].ship = None
-                self[Position(x, y)].safe = True
-                self[Position(x, y)].inspired = False
-
-        for _ in range(int(read_input())):
-            cell_x, cell_y, cell_energy = map(int, read_input().split())
-            self[Position(cell_x, cell_y)].halite_amount = cell_energy
+        self._ship_owner[indices] = owners
+        self._ships.update(zip(indices.tolist(), ships))
@@ -0,0 +1,53 @@
+"""
+Inspiration for every cell of the map at once.
+
+A ship is inspired when at least INSPIRATION_SHIP_COUNT opponent ships are
+within INSPIRATION_RADIUS (Manhattan distance, wrapping around the map).
+Ships are scattered onto an occupancy grid per player, and the grids are
+correlated with a wrapped diamond of that radius, giving the number of
+each player's ships within range of every cell.
+"""
+import numpy as np
+
+from . import constants
+from .convolution import ToroidalFilter, wrapped_kernel
+
+
+class InspirationField:
+    """
+    Counts ships within inspiration range of every cell.
+    """
+    def __init__(self, width, height, radius=None):
+        """
+        Precomputes the diamond kernel. Best done before calling ready.
+        :param width: The width of the map
+        :param height: The height of the map
+        :param radius: The inspiration radius, INSPIRATION_RADIUS by default
+        """
+        radius = constants.INSPIRATION_RADIUS if radius is None else radius
+        diamond = {(dx, dy): 1
+                   for dy in range(-radius, radius + 1)
+                   for dx in range(-radius, radius + 1)
+                   if abs(dx) + abs(dy) <= radius}
+        self._filter = ToroidalFilter(wrapped_kernel(width, height, diamond))
+
+    def counts(self, ship_owner, num_players):
+        """
+        :param ship_owner: A (height, width) grid of the owner of the ship in each cell, -1 if none, or a stack of them
+        :param num_players: The number of players in the game
+        :return: A (num_players, height, width) array of how many of each player's ships are in range of each cell,
+            with the same leading axes as ship_owner
+        """
+        occupancy = ship_owner[..., np.newaxis, :, :] == np.arange(num_players)[:, np.newaxis, np.newaxis]
+        return self._filter.counts(occupancy)
+
+    def inspired(self, ship_owner, player_id):
+        """
+        :param ship_owner: A (height, width) grid of the owner of the ship in each cell, -1 if none
+        :param player_id: The player whose ships would be inspired
+        :return: A (height, width) boolean grid of the cells where that player's ships are inspired
+        """
+        if not constants.INSPIRATION_ENABLED:
+            return np.zeros(ship_owner.shape, dtype=bool)
+        opponents = (ship_owner >= 0) & (ship_owner != player_id)
+        return self._filter.counts(opponents) >= constants.INSPIRATION_SHIP_COUNT
@@ -0,0 +1,140 @@
+"""
+Bot logging which keeps disk writes off the turn loop.
+
+In queued mode, log calls only format the record and put it on a queue. A
+background thread takes records off the queue in batches and writes and
+flushes each batch with one call, so a slow disk delays the log, not the
+turn. logging.shutdown, which read_input calls when the engine closes our
+input, closes the handler, and closing it writes out everything still
+queued before the bot exits.
+
+In either mode a TurnThrottle caps the records below WARNING kept per
+turn, noting how many were dropped once the turn is over.
+"""
+import logging
+import queue
+import threading
+
+# Records below WARNING kept per turn
+TURN_RECORD_LIMIT = 200
+# Records written per batch at most
+BATCH_SIZE = 512
+
+
+class TurnThrottle(logging.Filter):
+    """
+    Drops records below WARNING once a turn has logged TURN_RECORD_LIMIT of them.
+    """
+    def __init__(self, limit=TURN_RECORD_LIMIT):
+        """
+        :param limit: Records below WARNING kept per turn, or None for no limit
+        """
+        super().__init__()
+        self.limit = limit
+        self.turn = 0
+        self._kept = 0
+        self._dropped = 0
+
+    def next_turn(self, turn):
+        """
+        Starts counting a new turn, logging how many records the last one dropped
+        :param turn: The turn number
+        """
+        dropped, self._dropped = self._dropped, 0
+        self._kept = 0
+        if dropped:
+            logging.warning("Dropped {} log records on turn {}".format(dropped, self.turn))
+        self.turn = turn
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.limit is None:
+            return True
+        if self._kept >= self.limit:
+            self._dropped += 1
+            return False
+        self._kept += 1
+        return True
+
+
+class _Writer(threading.Thread):
+    """
+    Writes queued records to a file in batches.
+    """
+    _STOP = object()
+
+    def __init__(self, records, filename, mode):
+        super().__init__(name='log-writer', daemon=True)
+        self.records = records
+        self.file = open(filename, mode)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.records.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is self._STOP:
+                batch.pop()
+                stopping = True
+            if batch:
+                self.file.write(''.join(record.msg + '\n' for record in batch))
+                self.file.flush()
+        self.file.close()
+
+    def stop(self):
+        """
+        Writes out everything queued so far and waits for the thread to finish
+        """
+        self.records.put(self._STOP)
+        self.join()
+
+
+class QueuedFileHandler(logging.Handler):
+    """
+    Formats records in the logging thread and leaves writing them to a background _Writer.
+    """
+    def __init__(self, filename, mode='w'):
+        """
+        :param filename: The log file
+        :param mode: The mode to open it with
+        """
+        super().__init__()
+        self._records = queue.Queue()
+        self._writer = _Writer(self._records, filename, mode)
+        self._writer.start()
+
+    def emit(self, record):
+        try:
+            record = logging.makeLogRecord(record.__dict__)
+            record.msg = self.format(record)
+            record.args = None
+            record.exc_info = None
+            record.exc_text = None
+            self._records.put(record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._writer.stop()
+        super().close()
+
+
+def configure(filename, level=logging.DEBUG, queued=True, turn_limit=TURN_RECORD_LIMIT):
+    """
+    Sends the root logger's records to a file, replacing the same call to logging.basicConfig
+    :param filename: The log file, overwritten
+    :param level: The lowest level logged
+    :param queued: Whether to write from a background thread
+    :param turn_limit: Records below WARNING kept per turn, or None for no limit
+    :return: The TurnThrottle, whose next_turn should be called as each turn starts
+    """
+    handler = QueuedFileHandler(filename) if queued else logging.FileHandler(filename, 'w')
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    throttle = TurnThrottle(turn_limit)
+    handler.addFilter(throttle)
+    logging.basicConfig(level=level, handlers=[handler])
+    return throttle
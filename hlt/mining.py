@@ -0,0 +1,164 @@
+"""
+Multi-turn mining plans: where each ship should mine, and for how long.
+
+A ship heading out spends d turns reaching a target cell and m turns mining
+it. Each turn of mining takes 1/EXTRACT_RATIO of what the cell has left, so
+after m turns a cell of halite H has given H * (1 - (1 - 1/EXTRACT_RATIO)^m),
+more if the cell is inspiring, up to the ship's free space. The h turns back
+to the nearest dropoff are paid once per load, so a trip is charged the
+share of them its halite fills. A trip is worth
+
+    (mined - cost of leaving the target) / (d + m + h * mined / space)
+
+halite per turn. The fractions mined after each number of turns are
+precomputed, plain and inspired, so every ship, target cell and mining
+time is evaluated at once with broadcast arithmetic, in blocks of ships to
+bound memory. Targets are then handed out best rate first, one ship per
+cell, and each ship's plan is kept for inspection.
+"""
+import numpy as np
+
+from . import constants, profiling
+
+# Most turns of mining considered at one cell
+HORIZON = 8
+# Bonus to the rate of the target a ship is heading for, so ships do not swap targets over small differences
+STICKINESS = 0.25
+# Ships evaluated together; bounds the working arrays to BLOCK_SIZE * cells * HORIZON floats
+BLOCK_SIZE = 32
+
+
+class MiningPlanner:
+    """
+    Picks a target cell and a number of mining turns for each exploring ship.
+    """
+    def __init__(self, game_map, horizon=HORIZON):
+        """
+        Precomputes the extraction curves. Needs the game constants loaded.
+        :param game_map: The game map
+        :param horizon: The most turns of mining considered at one cell
+        """
+        self.game_map = game_map
+        self.horizon = horizon
+        # Turns of mining on the leading axis of the (turns, ships, cells) working arrays
+        self.turns = np.arange(1, horizon + 1, dtype=np.float32)[:, np.newaxis, np.newaxis]
+
+        # Fraction of a cell's halite left after each number of turns, and the fraction a ship gains, bonus
+        # included
+        self._left = (1 - 1 / constants.EXTRACT_RATIO) ** self.turns[:, 0]
+        self._inspired_left = (1 - 1 / constants.INSPIRED_EXTRACT_RATIO) ** self.turns[:, 0]
+        self._gained = 1 - self._left
+        self._inspired_gained = (1 - self._inspired_left) * (1 + constants.INSPIRED_BONUS_MULTIPLIER)
+
+        self.targets = {}
+        self.rates = {}
+        self.mining_turns = {}
+
+    def _curves(self, player):
+        """
+        :param player: The player whose ships are planned for
+        :return: The halite gained and the cost of leaving, each (horizon, cells), after each number of turns of
+            mining every cell. Cells with a structure or an enemy ship give nothing.
+        """
+        game_map = self.game_map
+        halite = game_map.halite.reshape(-1).astype(np.float32)
+        inspired = game_map.inspired.reshape(-1)
+        ship_owner = game_map.ship_owner.reshape(-1)
+        halite[(game_map.structure_owner.reshape(-1) != -1) | ((ship_owner != -1) & (ship_owner != player.id))] = 0
+
+        gained = halite * np.where(inspired, self._inspired_gained, self._gained).astype(np.float32)
+        leave_cost = halite * np.where(inspired, self._inspired_left / constants.INSPIRED_MOVE_COST_RATIO,
+                                       self._left / constants.MOVE_COST_RATIO).astype(np.float32)
+        return gained, leave_cost
+
+    def _trip_rates(self, gained, leave_cost, distances, home, space):
+        """
+        :param gained: Halite gained by mining each target for each number of turns, (horizon, ...)
+        :param leave_cost: The cost of leaving each target after each number of turns, (horizon, ...)
+        :param distances: Turns from each ship to each target
+        :param home: Turns from each target to the nearest dropoff
+        :param space: Each ship's free space
+        :return: The halite per turn of every trip, (horizon, ships, targets)
+        """
+        mined = np.minimum(gained, space)
+        trip_turns = mined * (home / space)
+        trip_turns += distances
+        trip_turns += self.turns
+        mined -= leave_cost
+        mined /= trip_turns
+        return mined
+
+    @profiling.timed('MiningPlanner.plan')
+    def plan(self, player, ships, turns_left=None):
+        """
+        Plans mining trips for ships, no two sharing a target. A ship's own cell is a candidate, so a ship told to
+        mine where it is should stay still.
+        :param player: The player owning the ships
+        :param ships: The ships to plan for
+        :param turns_left: Turns until the game ends; trips which would not be home by then are not considered
+        :return: A dict of ship id to the MapPosition of its target. Ships with no worthwhile trip are left out.
+            The rate and mining turns of each chosen trip are kept in rates and mining_turns. The targets are
+            remembered, and favoured by STICKINESS next time.
+        """
+        previous_targets = self.targets
+        self.rates = {}
+        self.mining_turns = {}
+        self.targets = {}
+        if not ships:
+            return {}
+
+        game_map = self.game_map
+        size = game_map.width * game_map.height
+        cells = np.arange(size)
+        gained, leave_cost = self._curves(player)
+        home = game_map.get_dropoff_distances(player).reshape(-1)
+        home_turns = home.astype(np.float32)
+        # Trips can only run out of time near the end of the game
+        if turns_left is not None and turns_left >= game_map.width + game_map.height + home.max() + self.horizon:
+            turns_left = None
+
+        indices = np.array([game_map.index(ship) for ship in ships], dtype=np.int64)
+        space = np.maximum(constants.MAX_HALITE - np.array([ship.halite_amount for ship in ships], dtype=np.float32), 1)
+        rates = np.empty((len(ships), size), dtype=np.float32)
+        for start in range(0, len(ships), BLOCK_SIZE):
+            block = slice(start, start + BLOCK_SIZE)
+            distances = game_map.calculate_distances(indices[block, np.newaxis], cells)
+            block_rates = self._trip_rates(gained[:, np.newaxis], leave_cost[:, np.newaxis], distances, home_turns,
+                                           space[block, np.newaxis])
+            if turns_left is not None:
+                trip_ends = distances + home
+                for turns, turn_rates in enumerate(block_rates, 1):
+                    np.copyto(turn_rates, -np.inf, where=trip_ends > turns_left - turns)
+            block_rates.max(axis=0, out=rates[block])
+
+        # A ship's own cell is not up for grabs: a cell one of our ships is mining is only a target for that ship
+        own = rates[np.arange(len(ships)), indices]
+        rates[:, indices] = -np.inf
+        rates[np.arange(len(ships)), indices] = own
+
+        # Ships on their way keep their course unless something clearly better turns up; ships which have arrived
+        # decide afresh each turn whether to keep mining
+        for i, ship in enumerate(ships):
+            previous = previous_targets.get(ship.id)
+            if previous is not None and previous.index != indices[i] and rates[i, previous.index] > 0:
+                rates[i, previous.index] *= 1 + STICKINESS
+
+        targets = {}
+        for i in np.argsort(-rates.max(axis=1), kind='stable').tolist():
+            target = int(rates[i].argmax())
+            rate = float(rates[i, target])
+            if not rate > 0:
+                continue
+            ship = ships[i]
+            targets[ship.id] = game_map.positions[target]
+            self.rates[ship.id] = rate
+            distance = game_map.calculate_distances(indices[i], target)
+            trip_rates = self._trip_rates(gained[:, np.newaxis, target:target + 1],
+                                          leave_cost[:, np.newaxis, target:target + 1], distance, home_turns[target],
+                                          space[i])
+            if turns_left is not None:
+                trip_rates[distance + home[target] + self.turns > turns_left] = -np.inf
+            self.mining_turns[ship.id] = int(trip_rates.argmax()) + 1
+            rates[:, target] = -np.inf
+        self.targets = targets
+        return targets
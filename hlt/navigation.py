@@ -0,0 +1,121 @@
+"""
+Halite-aware routes home.
+
+A single reverse Dijkstra from all of a player's dropoffs and shipyard
+gives every cell its cheapest shortest route home: of the routes taking
+the fewest turns, the one spending least halite, where leaving a cell costs
+the halite the engine deducts for it (1/MOVE_COST_RATIO of the cell,
+truncated). Turns come first because a detour to save a little halite costs
+more in mining time than it saves. Each ship's next step is then a lookup.
+Routes are kept until the move cost of some cell or the set of structures
+changes.
+"""
+import heapq
+
+import numpy as np
+
+from . import constants, profiling
+from .game_map import MOVES, NO_MOVE
+from .positionals import Direction
+
+
+class PathPlanner:
+    """
+    Cheapest shortest routes to one player's dropoffs and shipyard.
+    """
+    def __init__(self, game_map, player):
+        """
+        Precomputes cell adjacency. Best done before calling ready.
+        :param game_map: The game map
+        :param player: The player whose structures the routes lead to
+        """
+        self.game_map = game_map
+        self.player = player
+
+        # For each cell, its neighbours paired with the move code that leads back from them
+        self._neighbours = []
+        for position in game_map.positions.positions:
+            self._neighbours.append([(MOVES.index(Direction.invert(direction)),
+                                      game_map.index(position.directional_offset(direction)))
+                                     for direction in MOVES[:NO_MOVE]])
+
+        self._costs = None
+        self._structures = None
+        self._route_costs = []
+        self._next_steps = []
+        self._stale = True
+
+    def update(self):
+        """
+        Marks the routes stale if the player's structures or any cell's move cost changed since they were computed.
+        Only the cells the engine reported as changed this turn are compared, so call this once per turn after
+        update_frame. The routes themselves are recomputed on the next query.
+        :return: nothing
+        """
+        structures = tuple(self.game_map.index(structure)
+                           for structure in self.player.get_dropoffs() + [self.player.shipyard])
+        if structures != self._structures:
+            self._structures = structures
+            self._stale = True
+
+        halite = self.game_map.halite.reshape(-1)
+        if self._costs is None:
+            self._costs = halite // constants.MOVE_COST_RATIO
+            self._stale = True
+            return
+
+        changed = self.game_map.changed_cells
+        costs = halite[changed] // constants.MOVE_COST_RATIO
+        if np.any(costs != self._costs[changed]):
+            self._costs[changed] = costs
+            self._stale = True
+
+    @profiling.timed('PathPlanner._plan')
+    def _plan(self):
+        """
+        Runs the reverse Dijkstra from every structure, filling in route costs and first steps for every cell
+        """
+        size = self.game_map.width * self.game_map.height
+        # Turns and halite folded into one integer: turns * scale + halite, with scale above any route's halite
+        scale = int(self._costs.sum()) + 1
+        weights = (self._costs + scale).tolist()
+        best = [None] * size
+        next_steps = [NO_MOVE] * size
+
+        frontier = [(0, structure) for structure in self._structures]
+        for _, structure in frontier:
+            best[structure] = 0
+        heapq.heapify(frontier)
+
+        while frontier:
+            distance, cell = heapq.heappop(frontier)
+            if distance > best[cell]:
+                continue
+            for code, neighbour in self._neighbours[cell]:
+                candidate = distance + weights[neighbour]
+                if best[neighbour] is None or candidate < best[neighbour]:
+                    best[neighbour] = candidate
+                    next_steps[neighbour] = code
+                    heapq.heappush(frontier, (candidate, neighbour))
+
+        self._route_costs = [distance % scale for distance in best]
+        self._next_steps = next_steps
+        self._stale = False
+
+    def get_next_step(self, location):
+        """
+        :param location: A position or entity
+        :return: The Direction of the first step on the cheapest route home, Still if already home
+        """
+        if self._stale:
+            self._plan()
+        return MOVES[self._next_steps[self.game_map.index(location)]]
+
+    def calculate_route_cost(self, location):
+        """
+        :param location: A position or entity
+        :return: The halite a ship would spend on moves along the cheapest route home
+        """
+        if self._stale:
+            self._plan()
+        return self._route_costs[self.game_map.index(location)]
@@ -2,9 +2,14 @@ import json
 import logging
 import sys
 
-from .common import read_input
-from . import constants
+import numpy as np
+
+from .common import input_waiting, read_input, wait_for_input
+from .deadline import TurnClock, Watchdog
+from .frame import read_frame
+from . import constants, logs, profiling, recording
 from .game_map import GameMap, Player
+from .snapshot import GameSnapshot
 
 
 class Game:
@@ -14,7 +19,7 @@ class Game:
     def __init__(self):
         """
         Initiates a game object collecting all start-state instances for the contained items for pre-game.
-        Also sets up basic logging.
+        Also sets up logging, written from a background thread.
         """
         self.turn_number = 0
 
@@ -24,17 +29,20 @@ class Game:
 
         num_players, self.my_id = map(int, read_input().split())
 
-        logging.basicConfig(
-            filename="bot-{}.log".format(self.my_id),
-            filemode="w",
-            level=logging.DEBUG,
-        )
+        self.log_throttle = logs.configure("bot-{}.log".format(self.my_id))
+        recording.start("bot-{}.record".format(self.my_id))
 
         self.players = {}
         for player in range(num_players):
             self.players[player] = Player._generate()
         self.me = self.players[self.my_id]
         self.game_map = GameMap._generate()
+        for player in self.players.values():
+            player.shipyard.position = self.game_map.normalize(player.shipyard.position)
+        self.clock = TurnClock()
+        self.watchdog = None
+        self._clock_turn = None
+        profiling.start("bot-{}.profile.csv".format(self.my_id))
 
     def ready(self, name):
         """
@@ -43,44 +51,86 @@ class Game:
         """
         send_commands([name])
 
-    def update_frame(self):
+    @profiling.timed('Game.update_frame')
+    def update_frame(self, frame=None):
         """
         Updates the game object's state.
+        :param frame: A Frame to apply instead of reading the next turn from the game engine
         :returns: nothing.
         """
-        self.turn_number = int(read_input())
+        if frame is None:
+            # The engine's clock runs from when it sends the frame, so ours starts as the frame arrives
+            wait_for_input()
+            self.clock.arrived()
+            frame = read_frame(len(self.players))
+        self._clock_turn = self.clock.start()
+        profiling.next_turn(frame.turn_number)
+        recording.next_turn(frame.turn_number)
+        self.log_throttle.next_turn(frame.turn_number)
+
+        self.turn_number = frame.turn_number
         logging.info("=============== TURN {:03} ================".format(self.turn_number))
 
-        for _ in range(len(self.players)):
-            player, num_ships, num_dropoffs, halite = map(int, read_input().split())
-            self.players[player]._update(num_ships, num_dropoffs, halite)
+        ship_ends = np.cumsum(frame.players[:, 1])
+        dropoff_ends = np.cumsum(frame.players[:, 2])
+        ships = []
+        for i, (player, num_ships, num_dropoffs, halite) in enumerate(frame.players.tolist()):
+            self.players[player]._update(halite,
+                                         frame.ships[ship_ends[i] - num_ships:ship_ends[i]],
+                                         frame.dropoffs[dropoff_ends[i] - num_dropoffs:dropoff_ends[i]],
+                                         self.game_map.positions)
+            ships += self.players[player].get_ships()
 
-        self.game_map._update()
+        self.game_map._update(frame.cells)
 
-        # Mark cells with ships as unsafe for navigation
-        for player in self.players.values():
-            for ship in player.get_ships():
-                self.game_map[ship.position].set_ship(ship)
+        # Place ships on the map, in the same order as the frame's ship rows
+        self.game_map._place_ships(frame.ships[:, 3] * self.game_map.width + frame.ships[:, 2],
+                                   frame.ships[:, 0], ships)
 
+        for player in self.players.values():
             self.game_map[player.shipyard.position].structure = player.shipyard
             for dropoff in player.get_dropoffs():
                 self.game_map[dropoff.position].structure = dropoff
 
-    @staticmethod
-    def end_turn(commands):
+    def snapshot(self):
+        """
+        Copies the game as it is this turn for looking ahead. Snapshots share the map's arrays, so they are cheap to
+        take and fork, and only valid until the next update_frame.
+        :return: A GameSnapshot
+        """
+        return GameSnapshot.from_game(self)
+
+    def watch_deadline(self, fallback=None):
+        """
+        Starts a watchdog which ends any turn still running at the clock's deadline, sending fallback commands
+        :param fallback: Called with no arguments to build the fallback commands; by default every ship stays still
+        :return: nothing.
+        """
+        if self.watchdog is None:
+            self.watchdog = Watchdog(self.clock, send_commands, fallback, input_waiting)
+            self.watchdog.start()
+
+    def end_turn(self, commands):
         """
         Method to send all commands to the game engine, effectively ending your turn.
+        The commands are dropped if the watchdog has already ended this turn.
         :param commands: Array of commands to send to engine
         :return: nothing.
         """
-        send_commands(commands)
+        if self.clock.claim(self._clock_turn):
+            send_commands(commands)
+        else:
+            logging.warning("Turn {} ran past its deadline; fallback commands were sent".format(self.turn_number))
 
 
 def send_commands(commands):
     """
-    Sends a list of commands to the engine.
+    Sends a list of commands to the engine, recording them when recording is on.
     :param commands: The list of commands to send.
     :return: nothing.
     """
-    print(" ".join(commands))
+    line = " ".join(commands)
+    print(line)
     sys.stdout.flush()
+    if recording.recorder is not None:
+        recording.recorder.put(recording.OUTPUT, (line + "\n").encode())
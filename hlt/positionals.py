@@ -1,16 +1,74 @@
 from . import commands
 
 
-class Direction:
+class Direction(int):
     """
-    Holds positional tuples in relation to cardinal directions
+    A move direction. Directions are small integers (North, South, East,
+    West, Still = 0 to 4) which index lookup tables directly, and they still
+    behave as their (dx, dy) tuples: they unpack, index, compare equal and
+    hash alike, so code written against tuple directions keeps working and
+    either can look up the other in a dict or set. Unlike integers, every
+    direction is truthy, as a tuple is, and none equals a plain integer.
     """
-    North = (0, -1)
-    South = (0, 1)
-    East = (1, 0)
-    West = (-1, 0)
+    __slots__ = ()
 
-    Still = (0, 0)
+    def __new__(cls, code):
+        """
+        :param code: The direction's code, 0 to 4
+        :return: The shared instance for that code
+        """
+        return _DIRECTIONS[code]
+
+    @property
+    def dx(self):
+        return _OFFSETS[self][0]
+
+    @property
+    def dy(self):
+        return _OFFSETS[self][1]
+
+    @property
+    def command(self):
+        """
+        :return: The character for this direction in a move command
+        """
+        return commands.MOVE_CHARS[self]
+
+    def __iter__(self):
+        return iter(_OFFSETS[self])
+
+    def __getitem__(self, axis):
+        return _OFFSETS[self][axis]
+
+    def __len__(self):
+        return 2
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        if other.__class__ is Direction:
+            return self is other
+        if isinstance(other, tuple):
+            return _OFFSETS[self] == other
+        if isinstance(other, int):
+            return False
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return _HASHES[self]
+
+    def __repr__(self):
+        return "Direction.{}".format(_NAMES[self])
+
+    __str__ = __repr__
+
+    def __reduce__(self):
+        return Direction, (int(self),)
 
     @staticmethod
     def get_all_cardinals():
@@ -24,47 +82,58 @@ class Direction:
     def convert(direction):
         """
         Converts from this direction tuple notation to the engine's string notation
-        :param direction: the direction in this notation
+        :param direction: the direction, as a Direction or a (dx, dy) tuple
         :return: The character equivalent for the game engine
         """
-        if direction == Direction.North:
-            return commands.NORTH
-        if direction == Direction.South:
-            return commands.SOUTH
-        if direction == Direction.East:
-            return commands.EAST
-        if direction == Direction.West:
-            return commands.WEST
-        if direction == Direction.Still:
-            return commands.STAY_STILL
-        else:
-            raise IndexError
+        return commands.MOVE_CHARS[_code(direction)]
 
     @staticmethod
     def invert(direction):
         """
         Returns the opposite cardinal direction given a direction
-        :param direction: The input direction
+        :param direction: The input direction, as a Direction or a (dx, dy) tuple
         :return: The opposite direction
         """
-        if direction == Direction.North:
-            return Direction.South
-        if direction == Direction.South:
-            return Direction.North
-        if direction == Direction.East:
-            return Direction.West
-        if direction == Direction.West:
-            return Direction.East
-        if direction == Direction.Still:
-            return Direction.Still
-        else:
-            raise IndexError
+        return _INVERSES[_code(direction)]
+
+
+_NAMES = ('North', 'South', 'East', 'West', 'Still')
+_OFFSETS = ((0, -1), (0, 1), (1, 0), (-1, 0), (0, 0))
+_DIRECTIONS = tuple(int.__new__(Direction, code) for code in range(len(_NAMES)))
+_HASHES = tuple(hash(offset) for offset in _OFFSETS)
+_CODES = {offset: code for code, offset in enumerate(_OFFSETS)}
+Direction.North, Direction.South, Direction.East, Direction.West, Direction.Still = _DIRECTIONS
+_INVERSES = (Direction.South, Direction.North, Direction.West, Direction.East, Direction.Still)
+
+
+def _code(direction):
+    """
+    :return: The code of a Direction or (dx, dy) tuple, raising IndexError for anything else
+    """
+    if direction.__class__ is Direction:
+        return direction
+    try:
+        return _CODES[tuple(direction)]
+    except (KeyError, TypeError):
+        raise IndexError(direction)
 
 
 class Position:
+    """
+    An immutable, hashable (x, y) point. Positions equal to each other hash
+    alike, so they can key dicts and sets in place of (x, y) tuples.
+    """
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        _set(self, 'x', x)
+        _set(self, 'y', y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __reduce__(self):
+        return Position, (self.x, self.y)
 
     def directional_offset(self, direction):
         """
@@ -72,7 +141,7 @@ class Position:
         :param direction: the direction cardinal tuple
         :return: a new position moved in that direction
         """
-        return self + Position(*direction)
+        return Position(self.x + direction[0], self.y + direction[1])
 
     def get_surrounding_cardinals(self):
         """
@@ -86,16 +155,6 @@ class Position:
     def __sub__(self, other):
         return Position(self.x - other.x, self.y - other.y)
 
-    def __iadd__(self, other):
-        self.x += other.x
-        self.y += other.y
-        return self
-
-    def __isub__(self, other):
-        self.x -= other.x
-        self.y -= other.y
-        return self
-
     def __abs__(self):
         return Position(abs(self.x), abs(self.y))
 
@@ -105,7 +164,105 @@ class Position:
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        return hash((self.x, self.y))
+
     def __repr__(self):
         return "{}({}, {})".format(self.__class__.__name__,
                                    self.x,
                                    self.y)
+
+
+_set = object.__setattr__
+
+
+class MapPosition(Position):
+    """
+    A position on a map of a particular size, always within its bounds. There
+    is one MapPosition per cell, interned in the PositionTable for the map's
+    size, which also knows each one's neighbours, so moving to a neighbour or
+    listing them allocates nothing.
+    """
+    __slots__ = ('index', 'table')
+
+    def __init__(self, x, y, index, table):
+        """
+        :param x: The x coordinate, within the map
+        :param y: The y coordinate, within the map
+        :param index: The flat cell index, y * width + x
+        :param table: The PositionTable this position belongs to
+        """
+        super().__init__(x, y)
+        _set(self, 'index', index)
+        _set(self, 'table', table)
+
+    def __reduce__(self):
+        return _interned, (self.table.width, self.table.height, self.index)
+
+    def directional_offset(self, direction):
+        """
+        Returns the neighbouring position in a direction, wrapping around the map
+        :param direction: the direction cardinal tuple
+        :return: The interned MapPosition moved in that direction
+        """
+        if direction.__class__ is Direction:
+            return self.table.neighbours[self.index][direction]
+        code = _CODES.get(tuple(direction))
+        if code is None:
+            return self.table.at(self.x + direction[0], self.y + direction[1])
+        return self.table.neighbours[self.index][code]
+
+    def get_surrounding_cardinals(self):
+        """
+        :return: The neighbouring positions in each cardinal direction. The list is shared; do not modify it.
+        """
+        return self.table.cardinals[self.index]
+
+
+class PositionTable:
+    """
+    The interned MapPositions of every cell for one map size, indexed by flat cell index.
+    """
+    _tables = {}
+
+    def __init__(self, width, height):
+        """
+        :param width: The map width
+        :param height: The map height
+        """
+        self.width = width
+        self.height = height
+        self.positions = [MapPosition(x, y, y * width + x, self) for y in range(height) for x in range(width)]
+        self.neighbours = [[self.at(position.x + dx, position.y + dy)
+                            for dx, dy in Direction.get_all_cardinals()] + [position]
+                           for position in self.positions]
+        self.cardinals = [neighbours[:4] for neighbours in self.neighbours]
+
+    @staticmethod
+    def for_size(width, height):
+        """
+        :return: The shared table for a map size, created the first time it is asked for
+        """
+        table = PositionTable._tables.get((width, height))
+        if table is None:
+            table = PositionTable._tables[(width, height)] = PositionTable(width, height)
+        return table
+
+    def at(self, x, y):
+        """
+        :return: The MapPosition of (x, y), wrapped around the map
+        """
+        return self.positions[(y % self.height) * self.width + x % self.width]
+
+    def __getitem__(self, index):
+        """
+        :return: The MapPosition of a flat cell index
+        """
+        return self.positions[index]
+
+
+def _interned(width, height, index):
+    """
+    :return: The interned MapPosition of a cell, for unpickling
+    """
+    return PositionTable.for_size(width, height)[index]
@@ -0,0 +1,197 @@
+"""
+Per-turn timers and counters for the bot's hot paths.
+
+Profiling is switched on by setting the HALITE_PROFILE environment variable
+before the bot starts. When it is off, timed returns functions undecorated,
+section returns a shared do-nothing context manager and count does nothing,
+so instrumented code runs as if it were not instrumented.
+
+When it is on, every timed function and section records its calls, wall
+time and net change in allocated memory blocks (sys.getallocatedblocks)
+against the current turn. Turns are kept in ring buffers of the last
+HISTORY turns and written out as CSV, one row per turn and name, when the
+bot exits:
+
+    @profiling.timed()
+    def process_enemies(self):
+        ...
+
+    with profiling.section('resolve'):
+        ...
+"""
+import atexit
+import functools
+import os
+import sys
+import time
+
+import numpy as np
+
+ENABLED = bool(os.environ.get('HALITE_PROFILE'))
+# Turns kept in the ring buffers
+HISTORY = 1024
+
+
+class Profiler:
+    """
+    Ring buffers of per-turn calls, seconds and allocated blocks for each name.
+    """
+    def __init__(self, capacity=HISTORY):
+        """
+        :param capacity: The number of turns to keep
+        """
+        self.capacity = capacity
+        self.turns = np.full(capacity, -1, dtype=np.int64)
+        self._slot = 0
+        self._series = {}
+
+    def next_turn(self, turn):
+        """
+        Starts recording against a new turn, overwriting the oldest one kept
+        :param turn: The turn number
+        """
+        self._slot = turn % self.capacity
+        self.turns[self._slot] = turn
+        for calls, seconds, blocks in self._series.values():
+            calls[self._slot] = 0
+            seconds[self._slot] = 0.0
+            blocks[self._slot] = 0
+
+    def _arrays(self, name):
+        """
+        :return: The (calls, seconds, blocks) ring buffers for a name
+        """
+        series = self._series.get(name)
+        if series is None:
+            series = self._series[name] = (np.zeros(self.capacity, dtype=np.int64),
+                                           np.zeros(self.capacity),
+                                           np.zeros(self.capacity, dtype=np.int64))
+        return series
+
+    def record(self, name, seconds, blocks, calls=1):
+        """
+        :param name: What was measured
+        :param seconds: Wall time taken
+        :param blocks: Net change in allocated memory blocks
+        :param calls: The number of calls measured
+        """
+        series = self._arrays(name)
+        series[0][self._slot] += calls
+        series[1][self._slot] += seconds
+        series[2][self._slot] += blocks
+
+    def count(self, name, amount=1):
+        """
+        Adds to a counter without timing anything
+        """
+        self._arrays(name)[0][self._slot] += amount
+
+    def dump(self, path):
+        """
+        Writes the kept turns as CSV with columns turn, name, calls, seconds, blocks
+        :param path: The file to write
+        """
+        slots = np.flatnonzero(self.turns >= 0)
+        slots = slots[np.argsort(self.turns[slots])]
+        with open(path, 'w') as out:
+            out.write('turn,name,calls,seconds,blocks\n')
+            for slot in slots.tolist():
+                for name, (calls, seconds, blocks) in sorted(self._series.items()):
+                    if calls[slot]:
+                        out.write('{},{},{},{:.6f},{}\n'.format(self.turns[slot], name, calls[slot], seconds[slot],
+                                                                 blocks[slot]))
+
+
+profiler = Profiler() if ENABLED else None
+
+
+class _NullSection:
+    """
+    Stands in for a _Section when profiling is off.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section:
+    """
+    Times the body of a with statement.
+    """
+    __slots__ = ('name', '_start', '_blocks')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._blocks = sys.getallocatedblocks()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        profiler.record(self.name, time.perf_counter() - self._start, sys.getallocatedblocks() - self._blocks)
+        return False
+
+
+def start(path):
+    """
+    Arranges for the trace to be written when the bot exits. Does nothing when profiling is off.
+    :param path: The CSV file to write
+    """
+    if ENABLED:
+        atexit.register(profiler.dump, path)
+
+
+def next_turn(turn):
+    """
+    Starts recording against a new turn. Does nothing when profiling is off.
+    :param turn: The turn number
+    """
+    if ENABLED:
+        profiler.next_turn(turn)
+
+
+def timed(name=None):
+    """
+    Decorates a function to record each call against the current turn
+    :param name: The name to record under, the function's qualified name by default
+    :return: The decorator, which returns the function unchanged when profiling is off
+    """
+    def decorate(function):
+        if not ENABLED:
+            return function
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            blocks = sys.getallocatedblocks()
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(label, time.perf_counter() - start, sys.getallocatedblocks() - blocks)
+        return wrapper
+    return decorate
+
+
+def section(name):
+    """
+    :param name: The name to record under
+    :return: A context manager timing its body, or a shared do-nothing one when profiling is off
+    """
+    return _Section(name) if ENABLED else _NULL_SECTION
+
+
+def count(name, amount=1):
+    """
+    Adds to a per-turn counter. Does nothing when profiling is off.
+    """
+    if ENABLED:
+        profiler.count(name, amount)
@@ -0,0 +1,69 @@
+"""
+The halite "pull" on ships: for every cell, how strongly each cardinal
+direction is attracted by the surrounding halite.
+
+Every cell within a square window contributes its halite, weighted by
+1/d^2 for its distance d, to each direction that leads toward it. The
+ship's own cell leads nowhere, so it never pulls. The sum
+is evaluated for the whole map at once by correlating the halite grid with
+one kernel per direction, so a ship's ranking of directions is a lookup.
+"""
+import numpy as np
+
+from . import constants, profiling
+from .convolution import ToroidalFilter, wrapped_kernel
+from .game_map import MOVES, NO_MOVE
+from .positionals import Position
+
+
+class PullField:
+    """
+    Per-turn directional halite attraction for every cell of a map.
+    """
+    def __init__(self, game_map, radius=10, inspiration=True):
+        """
+        Precomputes the direction kernels. Best done before calling ready.
+        :param game_map: The game map
+        :param radius: Cells with offsets in [-radius, radius) along both axes pull on a ship
+        :param inspiration: Whether inspiring cells pull with their bonus; if not, every cell pulls with its halite
+        """
+        self.game_map = game_map
+        self.inspiration = inspiration
+        origin = 0
+        weights = [{} for _ in range(NO_MOVE)]
+        for dy in range(-radius, radius):
+            for dx in range(-radius, radius):
+                if dx == 0 and dy == 0:
+                    continue
+
+                target = game_map.index(Position(dx, dy))
+                weight = 1 / int(game_map.calculate_distances(origin, target)) ** 2
+                for code in game_map.get_unsafe_move_codes(origin, target):
+                    if code != NO_MOVE:
+                        weights[code][dx, dy] = weight
+
+        self._filter = ToroidalFilter([wrapped_kernel(game_map.width, game_map.height, direction_weights)
+                                       for direction_weights in weights])
+        self.pulls = np.zeros((NO_MOVE, game_map.height, game_map.width))
+        self._order = []
+
+    @profiling.timed('PullField.update')
+    def update(self):
+        """
+        Recomputes the field from the map's current halite and inspiration. Inspiring cells count
+        (INSPIRED_BONUS_MULTIPLIER + 1) times their halite, unless the field ignores inspiration.
+        :return: nothing
+        """
+        values = self.game_map.halite
+        if self.inspiration:
+            values = values * np.where(self.game_map.inspired, constants.INSPIRED_BONUS_MULTIPLIER + 1, 1)
+        # Rounded so that floating point error cannot break ties between equal pulls
+        self.pulls = np.round(self._filter(values), 6)
+        self._order = np.argsort(-self.pulls.reshape(NO_MOVE, -1), axis=0, kind='stable').T.tolist()
+
+    def ranked_moves(self, location):
+        """
+        :param location: A position or entity
+        :return: The cardinal Directions, from strongest to weakest pull, with ties in MOVES order
+        """
+        return [MOVES[code] for code in self._order[self.game_map.index(location)]]
@@ -0,0 +1,162 @@
+"""
+A record of the raw input and commands of a game, for replaying it offline.
+
+Recording is switched on by setting the HALITE_RECORD environment variable
+before the bot starts. While it is on, every chunk of input read_input and
+read_lines take from the engine, every line of commands send_commands
+writes, and a marker as each turn starts are put on a queue with a
+timestamp. A background thread writes them in batches to an append-only
+file, bot-<id>.record by default, so recording costs the turn loop a queue
+put per read.
+
+The file starts with MAGIC and the wall-clock time recording started, as a
+little-endian double. Each record is then a RECORD header of type, seconds
+since recording started and payload length, followed by the payload:
+
+    INPUT   bytes exactly as read from the engine
+    OUTPUT  one line of commands, with its newline
+    TURN    the turn number, as ASCII, following that turn's input
+
+Joining the INPUT payloads gives back the bot's stdin, which
+engine.benchmark plays back to bots:
+
+    python3 -m engine.benchmark bot-0.record --bots MyBot.py v6.py
+"""
+import atexit
+import os
+import queue
+import struct
+import threading
+import time
+
+ENABLED = bool(os.environ.get('HALITE_RECORD'))
+
+MAGIC = b'HLTREC1\n'
+HEADER = struct.Struct('<d')
+RECORD = struct.Struct('<BdI')
+
+INPUT = 1
+OUTPUT = 2
+TURN = 3
+
+# Records written per batch at most
+BATCH_SIZE = 512
+
+
+class Recorder(threading.Thread):
+    """
+    Timestamps records and writes them to a file in batches from a background thread.
+    Records put before the file is opened are held until it is.
+    """
+    _STOP = object()
+
+    def __init__(self):
+        super().__init__(name='recorder', daemon=True)
+        self.started = time.time()
+        self._clock_start = time.perf_counter()
+        self._records = queue.Queue()
+        self._file = None
+
+    def put(self, kind, payload):
+        """
+        :param kind: INPUT, OUTPUT or TURN
+        :param payload: The record, as bytes
+        """
+        self._records.put((kind, time.perf_counter() - self._clock_start, payload))
+
+    def open(self, path):
+        """
+        Starts writing to a file, overwriting it, beginning with the records held so far
+        :param path: The file to write
+        """
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + HEADER.pack(self.started))
+        self.start()
+        atexit.register(self.stop)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._records.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._records.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is self._STOP:
+                batch.pop()
+                stopping = True
+            self._file.write(b''.join(RECORD.pack(kind, seconds, len(payload)) + payload
+                                      for kind, seconds, payload in batch))
+            self._file.flush()
+        self._file.close()
+
+    def stop(self):
+        """
+        Writes out everything recorded so far and waits for the thread to finish
+        """
+        if self.is_alive():
+            self._records.put(self._STOP)
+            self.join()
+
+
+recorder = Recorder() if ENABLED else None
+
+
+def start(path):
+    """
+    Starts writing the record. Does nothing when recording is off.
+    :param path: The file to write
+    """
+    if ENABLED:
+        recorder.open(path)
+
+
+def next_turn(turn):
+    """
+    Marks the start of a turn, once its input has been read. Does nothing when recording is off.
+    :param turn: The turn number
+    """
+    if ENABLED:
+        recorder.put(TURN, str(turn).encode())
+
+
+def read_records(path):
+    """
+    :param path: A file written by a Recorder
+    :return: The wall-clock start time, and a list of (kind, seconds, payload) records
+    """
+    with open(path, 'rb') as record_file:
+        data = record_file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("{} is not a recording".format(path))
+    offset = len(MAGIC)
+    started, = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+
+    records = []
+    # A record cut short by the bot being killed mid-write is dropped
+    while offset + RECORD.size <= len(data):
+        kind, seconds, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + length > len(data):
+            break
+        records.append((kind, seconds, data[offset:offset + length]))
+        offset += length
+    return started, records
+
+
+def is_recording(path):
+    """
+    :return: Whether a file was written by a Recorder
+    """
+    with open(path, 'rb') as record_file:
+        return record_file.read(len(MAGIC)) == MAGIC
+
+
+def recorded_input(path):
+    """
+    :param path: A file written by a Recorder
+    :return: Everything the bot read from the engine, as bytes
+    """
+    return b''.join(payload for kind, _, payload in read_records(path)[1] if kind == INPUT)
@@ -0,0 +1,74 @@
+"""
+Conflict-free moves for a whole fleet at once.
+
+Each ship proposes its moves in order of preference. Ships are matched to
+distinct destination cells by augmenting paths: a ship first takes its most
+preferred free cell, and only if none is free does it displace a ship that
+can move on to another of its own choices. Swaps and longer cycles of ships
+trading places are ordinary matchings, so they need no special handling.
+"""
+from . import profiling
+from .positionals import Direction
+
+
+@profiling.timed()
+def resolve_moves(game_map, candidates, shared_cells=()):
+    """
+    Assigns every ship a move such that no two ships end on the same cell, wherever possible.
+    :param game_map: The game map
+    :param candidates: A list of (ship, [Direction, ...]) pairs, moves from most to least preferred.
+        Ships earlier in the list win ties. A ship whose moves all conflict stays still if staying is among its
+        moves, and otherwise keeps its first choice; it never takes a move it was not offered.
+    :param shared_cells: Flat cell indices any number of ships may end on, e.g. a dropoff at the end of the game
+    :return: A list of (ship, Direction) pairs, in the same order as candidates
+    """
+    shared_cells = set(shared_cells)
+    # For each ship, its candidate (cell, direction) pairs
+    options = [[(game_map.index(ship.position.directional_offset(direction)), direction)
+                for direction in directions]
+               for ship, directions in candidates]
+    assigned = [None] * len(candidates)
+    claimed = {}
+
+    for start in range(len(candidates)):
+        # Breadth-first search for the shortest chain of displacements ending on a free cell
+        parents = {start: None}
+        seen = set()
+        queue = [start]
+        for ship in queue:
+            free = None
+            for option in options[ship]:
+                cell = option[0]
+                if cell in shared_cells or cell not in claimed:
+                    free = option
+                    break
+                if cell not in seen:
+                    seen.add(cell)
+                    owner = claimed[cell]
+                    if owner not in parents:
+                        parents[owner] = (ship, option)
+                        queue.append(owner)
+
+            if free is not None:
+                # Walk the chain back, moving each displaced ship onto its new cell
+                while ship is not None:
+                    assigned[ship] = free
+                    if free[0] not in shared_cells:
+                        claimed[free[0]] = ship
+                    if parents[ship] is None:
+                        break
+                    ship, free = parents[ship]
+                break
+
+    return [(ship, option[1] if option is not None else _fallback(directions))
+            for (ship, directions), option in zip(candidates, assigned)]
+
+
+def _fallback(directions):
+    """
+    :param directions: A ship's moves, from most to least preferred
+    :return: The move of a ship none of whose moves could be given a cell of its own
+    """
+    if not directions or Direction.Still in directions:
+        return Direction.Still
+    return directions[0]
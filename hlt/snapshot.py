@@ -0,0 +1,305 @@
+"""
+Forkable copies of the game for looking ahead.
+
+A snapshot reads the live GameMap's arrays and keeps only what differs from
+them: the halite of cells it has changed and the structures it has built,
+in small dicts. Forking copies those dicts, the players' energy and the
+ship table, so it costs O(changed cells + ships) however large the map.
+Snapshots read the map as it is, so they are only valid until the next
+update_frame.
+
+GameSnapshot.step plays one turn of hypothetical commands by the engine's
+rules, in the engine's order: dropoff construction, moves paid for from
+cargo, spawns, collisions, inspiration, mining by ships which stayed still,
+and deposits:
+
+    snapshot = game.snapshot()
+    for commands in candidates:
+        branch = snapshot.fork()
+        branch.step_commands({game.my_id: commands})
+        score = branch.energy[game.my_id]
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import commands as command_chars, constants
+from .positionals import Direction
+
+ShipState = namedtuple('ShipState', ['owner', 'index', 'halite_amount', 'inspired'])
+ShipState.__doc__ = """
+A ship in a snapshot: its owner, flat cell index, cargo and whether it is inspired.
+"""
+
+_MOVE_CODES = {char: code for code, char in enumerate(command_chars.MOVE_CHARS)}
+
+
+class MapSnapshot:
+    """
+    The halite and structures of a GameMap, with changes kept apart from the map itself.
+    """
+    __slots__ = ('base', 'halite', 'structures', 'total_halite')
+
+    def __init__(self, base, halite=None, structures=None, total_halite=None):
+        """
+        :param base: The GameMap to read unchanged cells from
+        :param halite: Flat cell index to halite, for cells which differ from the map
+        :param structures: Flat cell index to owner, for structures built since the snapshot was taken
+        :param total_halite: The halite on the whole map, the map's total by default
+        """
+        self.base = base
+        self.halite = {} if halite is None else halite
+        self.structures = {} if structures is None else structures
+        self.total_halite = base.total_halite if total_halite is None else total_halite
+
+    def fork(self):
+        """
+        :return: A copy which can be changed without affecting this one
+        """
+        return MapSnapshot(self.base, dict(self.halite), dict(self.structures), self.total_halite)
+
+    def halite_at(self, index):
+        """
+        :param index: A flat cell index
+        :return: The halite in the cell
+        """
+        amount = self.halite.get(index)
+        return self.base._halite.item(index) if amount is None else amount
+
+    def set_halite(self, index, amount):
+        """
+        :param index: A flat cell index
+        :param amount: The cell's new halite
+        """
+        self.total_halite += amount - self.halite_at(index)
+        self.halite[index] = amount
+
+    def halite_amount(self, location):
+        """
+        :param location: A position or entity
+        :return: The halite in its cell
+        """
+        return self.halite_at(self.base.index(location))
+
+    def structure_owner(self, index):
+        """
+        :param index: A flat cell index
+        :return: The id of the player owning the structure in the cell, -1 if none
+        """
+        owner = self.structures.get(index)
+        return self.base._structure_owner.item(index) if owner is None else owner
+
+    def get_halite_array(self):
+        """
+        :return: A new (height, width) array of the halite in every cell
+        """
+        halite = self.base.halite.copy()
+        if self.halite:
+            halite.reshape(-1)[list(self.halite)] = list(self.halite.values())
+        return halite
+
+
+class GameSnapshot:
+    """
+    A forkable copy of the whole game: the map, every player's energy and every ship.
+
+    Players are indexed by id. Ships are ShipStates keyed by ship id.
+    After each step, spawned, destroyed and converted list the ids of ships
+    which appeared, sank, or became dropoffs during it, as on Player. Ships
+    spawned in a snapshot are given ids after every ship it knows of.
+    """
+    __slots__ = ('map', 'turn_number', 'energy', 'ships', 'shipyards', 'next_ship_id',
+                 'spawned', 'destroyed', 'converted')
+
+    def __init__(self, game_map, turn_number, energy, ships, shipyards, next_ship_id=None):
+        """
+        :param game_map: A MapSnapshot
+        :param turn_number: The turn the snapshot shows
+        :param energy: A list of each player's halite, indexed by player id
+        :param ships: A dict of ship id to ShipState
+        :param shipyards: A list of each player's shipyard flat cell index, indexed by player id
+        :param next_ship_id: The id to give the next ship spawned, after every ship in ships by default
+        """
+        self.map = game_map
+        self.turn_number = turn_number
+        self.energy = energy
+        self.ships = ships
+        self.shipyards = shipyards
+        self.next_ship_id = max(ships, default=-1) + 1 if next_ship_id is None else next_ship_id
+        self.spawned = []
+        self.destroyed = []
+        self.converted = []
+
+    @staticmethod
+    def from_game(game):
+        """
+        :param game: A Game whose frame has been read this turn
+        :return: A snapshot of the game as it is now
+        """
+        game_map = game.game_map
+        players = sorted(game.players.values(), key=lambda player: player.id)
+        ships = [ship for player in players for ship in player.get_ships()]
+        indices = np.array([game_map.index(ship) for ship in ships], dtype=np.int64)
+        owners = np.array([ship.owner for ship in ships], dtype=np.int64)
+        inspired = _inspired(game_map, indices, owners).tolist()
+        return GameSnapshot(MapSnapshot(game_map), game.turn_number,
+                            [player.halite_amount for player in players],
+                            {ship.id: ShipState(ship.owner, index, ship.halite_amount, ship_inspired)
+                             for ship, index, ship_inspired in zip(ships, indices.tolist(), inspired)},
+                            [game_map.index(player.shipyard) for player in players])
+
+    def fork(self):
+        """
+        :return: A copy which can be stepped without affecting this one
+        """
+        return GameSnapshot(self.map.fork(), self.turn_number, list(self.energy), dict(self.ships), self.shipyards,
+                            self.next_ship_id)
+
+    @property
+    def is_over(self):
+        """
+        :return: Whether the snapshot has reached the last turn of the game
+        """
+        return self.turn_number >= constants.MAX_TURNS
+
+    def get_ships(self, player_id):
+        """
+        :param player_id: A player id
+        :return: A dict of ship id to ShipState for that player's ships
+        """
+        return {ship_id: ship for ship_id, ship in self.ships.items() if ship.owner == player_id}
+
+    def step_commands(self, commands):
+        """
+        Plays one turn of commands as they would be sent to the engine
+        :param commands: A dict of player id to the list of commands that player would pass to Game.end_turn.
+            Players left out send nothing.
+        :return: nothing.
+        """
+        moves = {}
+        spawns = []
+        constructs = []
+        for player_id, player_commands in commands.items():
+            tokens = " ".join(player_commands).split()
+            i = 0
+            while i < len(tokens):
+                if tokens[i] == command_chars.GENERATE:
+                    spawns.append(player_id)
+                    i += 1
+                elif tokens[i] == command_chars.CONSTRUCT:
+                    constructs.append(int(tokens[i + 1]))
+                    i += 2
+                elif tokens[i] == command_chars.MOVE:
+                    moves[int(tokens[i + 1])] = _MOVE_CODES[tokens[i + 2]]
+                    i += 3
+                else:
+                    raise ValueError("Unknown command {!r}".format(tokens[i]))
+        self.step(moves, spawns, constructs)
+
+    def step(self, moves=None, spawns=(), constructs=()):
+        """
+        Plays one turn by the engine's rules
+        :param moves: A dict of ship id to Direction (or direction code). Ships left out stay still.
+        :param spawns: Ids of the players who spawn a ship
+        :param constructs: Ids of the ships which turn into dropoffs
+        :return: nothing.
+        """
+        game_map = self.map
+        neighbours = game_map.base.positions.neighbours
+        energy = self.energy
+        ships = self.ships
+        self.turn_number += 1
+        self.spawned = []
+        self.converted = []
+        self.destroyed = []
+
+        # Dropoff construction, with the cell's halite credited towards the cost
+        for ship_id in sorted(constructs):
+            ship = ships.get(ship_id)
+            if ship is None:
+                continue
+            credit = ship.halite_amount + game_map.halite_at(ship.index)
+            if game_map.structure_owner(ship.index) != -1 or energy[ship.owner] + credit < constants.DROPOFF_COST:
+                continue
+            energy[ship.owner] += credit - constants.DROPOFF_COST
+            game_map.set_halite(ship.index, 0)
+            game_map.structures[ship.index] = ship.owner
+            del ships[ship_id]
+            self.converted.append(ship_id)
+
+        # Moves, paid for from cargo at the rate of the cell being left. Ships which cannot pay stay still.
+        still = set()
+        occupants = {}
+        for ship_id, ship in list(ships.items()):
+            move = Direction.Still if moves is None else moves.get(ship_id, Direction.Still)
+            if move != Direction.Still:
+                ratio = constants.INSPIRED_MOVE_COST_RATIO if ship.inspired else constants.MOVE_COST_RATIO
+                cost = game_map.halite_at(ship.index) // ratio
+                if ship.halite_amount >= cost:
+                    ship = ships[ship_id] = ShipState(ship.owner, neighbours[ship.index][move].index,
+                                                      ship.halite_amount - cost, ship.inspired)
+                else:
+                    still.add(ship_id)
+            else:
+                still.add(ship_id)
+            occupants.setdefault(ship.index, []).append(ship_id)
+
+        # Spawns appear on the shipyard this turn, without mining
+        for player_id in spawns:
+            if energy[player_id] < constants.SHIP_COST:
+                continue
+            energy[player_id] -= constants.SHIP_COST
+            ship_id = self.next_ship_id
+            self.next_ship_id += 1
+            ships[ship_id] = ShipState(player_id, self.shipyards[player_id], 0, False)
+            occupants.setdefault(self.shipyards[player_id], []).append(ship_id)
+            self.spawned.append(ship_id)
+
+        # Collisions sink every ship involved. Their cargo goes to the owner of a structure on the cell, or
+        # into the sea
+        for index, ship_ids in occupants.items():
+            if len(ship_ids) < 2:
+                continue
+            cargo = sum(ships.pop(ship_id).halite_amount for ship_id in ship_ids)
+            owner = game_map.structure_owner(index)
+            if owner != -1:
+                energy[owner] += cargo
+            else:
+                game_map.set_halite(index, game_map.halite_at(index) + cargo)
+            self.destroyed += ship_ids
+
+        # Inspiration at the ships' new positions
+        ship_ids = list(ships)
+        inspired = _inspired(game_map.base, np.array([ships[ship_id].index for ship_id in ship_ids], dtype=np.int64),
+                             np.array([ships[ship_id].owner for ship_id in ship_ids], dtype=np.int64)).tolist()
+
+        # Mining by ships which stayed still, then deposits on friendly structures
+        for ship_id, ship_inspired in zip(ship_ids, inspired):
+            owner, index, cargo, _ = ships[ship_id]
+            if ship_id in still:
+                halite = game_map.halite_at(index)
+                space = constants.MAX_HALITE - cargo
+                ratio = constants.INSPIRED_EXTRACT_RATIO if ship_inspired else constants.EXTRACT_RATIO
+                taken = min(-(-halite // ratio), space)
+                bonus = int(taken * constants.INSPIRED_BONUS_MULTIPLIER) if ship_inspired else 0
+                if taken:
+                    game_map.set_halite(index, halite - taken)
+                cargo += min(taken + bonus, space)
+            if game_map.structure_owner(index) == owner:
+                energy[owner] += cargo
+                cargo = 0
+            ships[ship_id] = ShipState(owner, index, cargo, ship_inspired)
+
+
+def _inspired(game_map, indices, owners):
+    """
+    :param game_map: The GameMap, for its distance tables
+    :param indices: Flat cell index of each ship
+    :param owners: Owner of each ship
+    :return: Whether each ship has enough opponent ships within inspiration range
+    """
+    if not constants.INSPIRATION_ENABLED or not len(indices):
+        return np.zeros(len(indices), dtype=bool)
+    near = game_map.calculate_distances(indices[:, np.newaxis], indices) <= constants.INSPIRATION_RADIUS
+    opponents = near & (owners[:, np.newaxis] != owners)
+    return opponents.sum(axis=1) >= constants.INSPIRATION_SHIP_COUNT
@@ -0,0 +1,3 @@
+#!/bin/bash
+
+python3.6 -m pip install --system --target . numpy
@@ -1,3 +1,6 @@
 #!/bin/sh
 
-./halite --replay-directory replays/ -vvv --width 32 --height 32 "python3 MyBot.py" "python3 MyBot.py"
+# The bundled ./halite is a macOS binary; elsewhere use the local Python engine
+if [ "$(uname)" = "Darwin" ]; then HALITE=./halite; else HALITE="python3 -m engine"; fi
+
+$HALITE --replay-directory replays/ -vvv --width 32 --height 32 "python3 MyBot.py" "python3 MyBot.py"
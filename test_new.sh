@@ -1,4 +1,7 @@
 #!/bin/sh
 
+# The bundled ./halite is a macOS binary; elsewhere use the local Python engine
+if [ "$(uname)" = "Darwin" ]; then HALITE=./halite; else HALITE="python3 -m engine"; fi
+
 rm replays/*
-./halite --replay-directory replays/ -vvv --width 64 --height 64 "python3 MyBot.py" "python3 v6.py"
+$HALITE --replay-directory replays/ -vvv --width 64 --height 64 "python3 MyBot.py" "python3 v6.py"
@@ -0,0 +1,40 @@
+import unittest
+
+from hlt.entity import Ship
+from hlt.game_map import GameMap
+from hlt.positionals import Direction, Position
+from hlt.resolution import resolve_moves
+
+
+class ResolveMovesTest(unittest.TestCase):
+    def setUp(self):
+        self.game_map = GameMap([0] * 64, 8, 8)
+
+    def ship(self, ship_id, x, y):
+        return Ship(0, ship_id, Position(x, y), 0)
+
+    def destinations(self, moves):
+        return [self.game_map.index(ship.position.directional_offset(direction)) for ship, direction in moves]
+
+    def test_displaces_a_ship_which_may_not_stay(self):
+        # a's own cell is wanted by b, so a may only move east, onto the cell c would rather stay on
+        a, b, c = self.ship(1, 2, 2), self.ship(2, 1, 2), self.ship(3, 3, 2)
+        candidates = [(c, [Direction.Still, Direction.East]), (a, [Direction.East]), (b, [Direction.East])]
+
+        moves = resolve_moves(self.game_map, candidates)
+
+        self.assertEqual(moves, [(c, Direction.East), (a, Direction.East), (b, Direction.East)])
+        self.assertEqual(len(set(self.destinations(moves))), len(moves))
+
+    def test_blocked_ship_keeps_to_its_own_moves(self):
+        # c and d cannot give way, so a has no cell of its own, and may not stay because b is moving in
+        a, b, c, d = self.ship(1, 2, 2), self.ship(2, 1, 2), self.ship(3, 3, 2), self.ship(4, 2, 0)
+        candidates = [(c, [Direction.Still]), (d, [Direction.South]), (b, [Direction.East]),
+                      (a, [Direction.East, Direction.North])]
+
+        moves = resolve_moves(self.game_map, candidates)
+
+        self.assertEqual(moves, [(c, Direction.Still), (d, Direction.South), (b, Direction.East),
+                                 (a, Direction.East)])
+        destinations = self.destinations(moves)
+        self.assertNotEqual(destinations[3], destinations[2])
@@ -3,9 +3,9 @@
 import sys
 import hlt
 from hlt import constants, Direction, Position
+from hlt.pull import PullField
 import logging
 import random
-import operator
 from bisect import bisect_left
 
 
@@ -21,6 +21,7 @@ class Brain:
         Object containing all strategy.
         """
         self.game = game
+        self.pull = PullField(game.game_map)
         self.ship_status = {}
         self.spawn_cutoff = constants.MAX_TURNS * 1/2
         self.return_amount = constants.MAX_HALITE * 0.8
@@ -39,6 +40,7 @@ class Brain:
         self.is_end_game = False
 
         self.process_enemies()
+        self.pull.update()
 
         # determine if we are in 'endgame'
         self.turns_left = constants.MAX_TURNS - self.game.turn_number
@@ -144,39 +146,12 @@ class Brain:
             return self.return_to_dropoff(ship)
 
     def get_best_dir(self, ship):
-        directions = {
-                Direction.North: 0,
-                Direction.South: 0,
-                Direction.East: 0,
-                Direction.West: 0
-                }
-
-        for row in range(-10, 10):
-            for col in range(-10, 10):
-                if col == 0 and row == 0: continue
-
-                pos = Position(ship.position.x + col, ship.position.y + row)
-                dist = self.map.calculate_distance(ship.position, pos)
-                pull = self.map[pos].halite_amount / dist**2
-                if self.map[pos].inspired:
-                    pull *= (constants.INSPIRED_BONUS_MULTIPLIER + 1)
-
-                for move in self.map.get_unsafe_moves(ship.position, pos):
-                    directions[move] += pull
-
-        best_safe = None
-        while len(directions):
-            best_direction = max(directions.items(), key=operator.itemgetter(1))[0]
-            directions.pop(best_direction)
-            cell = self.map[ship.position.directional_offset(best_direction)]
+        for direction in self.pull.ranked_moves(ship):
+            cell = self.map[ship.position.directional_offset(direction)]
             if cell.safe:
-                best_safe = cell
-                break
-
-        if best_safe is None:
-            raise ValueError('No safe adjacent positions!')
+                return cell
 
-        return best_safe
+        raise ValueError('No safe adjacent positions!')
 
     def explore(self, ship):
         best_cell = self.get_best_dir(ship)
@@ -298,8 +273,8 @@ def main():
     game = hlt.Game()
     # This is a good place to do computationally expensive start-up pre-processing.
     # As soon as you call "ready" function below, the 2 second per turn timer will start.
-    game.ready("v6")
     brain = Brain(game)
+    game.ready("v6")
 
     logging.info(constants.INSPIRATION_RADIUS)
     logging.info(constants.INSPIRATION_ENABLED)